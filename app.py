@@ -5,16 +5,23 @@ from streamlit_utils import render_data_list, render_selected_data_section
 from streamlit_utils import render_xlsx_upload_section, handle_uploaded_xlsx_files
 from streamlit_utils import render_xlsx_table_selector, render_selected_xlsx_tables
 from streamlit_utils import render_table_editor, render_table_edit_buttons, handle_table_submission
-from streamlit_utils import render_generated_table
+from streamlit_utils import render_generated_table, render_export_section
+from streamlit_utils import start_profiling_run, render_profiling_panel
+from config import get_settings
 
 def initialize_session_state():
     st.session_state.setdefault("files_processed", False)
     st.session_state.setdefault("data_list", [])
     st.session_state.setdefault("edited_table_data", {})
+    st.session_state.setdefault("fill_jobs", {})
+    st.session_state.setdefault("generated_tables", {})
 
 st.set_page_config(layout="wide")
 
+get_settings()  # .env를 먼저 읽어 둡니다. (한 번만 실행)
+
 initialize_session_state()
+start_profiling_run()
 
 st.title("📖 문서 추출")
 
@@ -62,4 +69,9 @@ with col3:
         render_table_edit_buttons(sheet_name, table_index, edited_df)
         handle_table_submission()
 
-        render_generated_table()
\ No newline at end of file
+        render_generated_table()
+
+        st.divider()
+        render_export_section()
+
+render_profiling_panel()
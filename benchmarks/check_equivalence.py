@@ -0,0 +1,286 @@
+"""
+표 탐지/추출 동등성 검사.
+
+    python -m benchmarks.check_equivalence                 # 무작위 그리드 3000개, 통합 문서 40개
+    python -m benchmarks.check_equivalence --grids 20000 --workbooks 200 --seed 7
+
+- find_tables: 채워진 셀만 방문하는 구현이 시트 전체를 훑던 처음 구현과 같은 영역을 같은 순서로 돌려주는지
+  무작위 그리드로 확인합니다.
+- process_xlsx_file: 모든 리더(xlsx_readers.XLSX_READERS)의 결과가 처음 구현(openpyxl로 읽어 표마다
+  DataFrame을 만들고 제목 행을 나누던 방식)과 같은 표를 만드는지 무작위 통합 문서로 확인합니다.
+  공유 문자열, 날짜 서식, 1904 날짜 체계, 좌표(r 속성)가 없는 행/셀을 섞어 만듭니다.
+
+다른 결과가 나오면 처음 몇 개를 출력하고 종료 코드 1로 끝납니다.
+"""
+import argparse
+import random
+import re
+import sys
+import zipfile
+from datetime import datetime, timedelta
+from io import BytesIO
+from typing import Dict, List, Tuple
+
+import pandas as pd
+from openpyxl import Workbook, load_workbook
+from openpyxl.utils.datetime import CALENDAR_MAC_1904
+
+from data_utils import find_tables, process_xlsx_file
+from table_types import with_header
+from xlsx_readers import XLSX_READERS
+
+Cells = Dict[Tuple[int, int], object]
+
+MAX_REPORTED = 5  # 불일치는 처음 몇 개만 자세히 출력합니다.
+
+
+def reference_find_tables(cells: Cells) -> List[Tuple[int, int, int, int]]:
+    """처음 구현(시트의 외곽 범위 전체를 칸마다 훑는 방식)을 값 그리드에 그대로 옮긴 기준 구현"""
+    max_row = max((r for r, _ in cells), default=0)
+    max_col = max((c for _, c in cells), default=0)
+
+    def filled(r, c):
+        return cells.get((r, c)) is not None
+
+    visited = [[False] * (max_col + 2) for _ in range(max_row + 2)]
+    tables = []
+    for r in range(1, max_row + 1):
+        for c in range(1, max_col + 1):
+            if visited[r][c]:
+                continue
+            if r > 1 and filled(r - 1, c) and not visited[r - 1][c]:
+                continue
+            if c > 1 and filled(r, c - 1) and not visited[r][c - 1]:
+                continue
+
+            has_right = c + 1 <= max_col and filled(r, c + 1)
+            has_bottom = r + 1 <= max_row and filled(r + 1, c)
+            if not (filled(r, c) or (has_right and has_bottom)):
+                continue
+
+            start_row, start_col = r, c
+            end_row, end_col = r, c
+            while end_row < max_row and any(
+                filled(end_row + 1, col) and not visited[end_row + 1][col] for col in range(start_col, end_col + 1)
+            ):
+                end_row += 1
+            while end_col < max_col and any(
+                filled(row, end_col + 1) and not visited[row][end_col + 1] for row in range(start_row, end_row + 1)
+            ):
+                end_col += 1
+
+            for rr in range(start_row, end_row + 1):
+                for cc in range(start_col, end_col + 1):
+                    visited[rr][cc] = True
+            tables.append((start_row, end_row, start_col, end_col))
+    return tables
+
+
+def random_grid(rng: random.Random) -> Cells:
+    """드문드문 채운 칸과 꽉 찬 직사각형(표)을 섞은 작은 그리드"""
+    n_rows, n_cols = rng.randint(1, 14), rng.randint(1, 14)
+    density = rng.choice([0.1, 0.3, 0.5, 0.8])
+    cells = {}
+    for r in range(1, n_rows + 1):
+        for c in range(1, n_cols + 1):
+            if rng.random() < density:
+                cells[(r, c)] = "x"
+    for _ in range(rng.randint(0, 3)):
+        top, left = rng.randint(1, n_rows), rng.randint(1, n_cols)
+        for r in range(top, min(top + rng.randint(1, 5), n_rows + 1)):
+            for c in range(left, min(left + rng.randint(1, 5), n_cols + 1)):
+                cells[(r, c)] = "t"
+    return cells
+
+
+def _format_grid(cells: Cells) -> str:
+    max_row = max((r for r, _ in cells), default=0)
+    max_col = max((c for _, c in cells), default=0)
+    return "\n".join(
+        "".join("#" if (r, c) in cells else "." for c in range(1, max_col + 1)) for r in range(1, max_row + 1)
+    )
+
+
+def check_find_tables(n_grids: int, seed: int) -> int:
+    rng = random.Random(seed)
+    failures = 0
+    for i in range(n_grids):
+        cells = random_grid(rng)
+        expected = reference_find_tables(cells)
+        actual = find_tables(cells)
+        if actual != expected:
+            failures += 1
+            if failures <= MAX_REPORTED:
+                print(f"[find_tables] 그리드 {i}: 기준 {expected} / 결과 {actual}\n{_format_grid(cells)}\n")
+    print(f"find_tables: 그리드 {n_grids}개 중 {failures}개 불일치")
+    return failures
+
+
+def reference_process_xlsx(data: bytes) -> Dict[str, List[pd.DataFrame]]:
+    """처음 process_xlsx_file: openpyxl로 읽고, 표마다 DataFrame을 만든 뒤 제목 행(첫 칸에만 값)을 나눕니다."""
+    wb = load_workbook(BytesIO(data), data_only=True)
+    sheet_data = {}
+    for ws in wb.worksheets:
+        cells = {coord: cell.value for coord, cell in ws._cells.items() if cell.value is not None}
+        dfs = []
+        for start_row, end_row, start_col, end_col in reference_find_tables(cells):
+            df = pd.DataFrame([
+                [cells.get((r, c)) for c in range(start_col, end_col + 1)]
+                for r in range(start_row, end_row + 1)
+            ])
+            first_row = df.iloc[0]
+            if len(df) >= 2 and pd.notna(first_row.iloc[0]) and first_row.iloc[1:].isna().all():
+                dfs += [pd.DataFrame([[first_row.iloc[0]]]), df.iloc[1:].reset_index(drop=True)]
+            else:
+                dfs.append(df)
+        if dfs:
+            sheet_data[ws.title] = dfs
+    return sheet_data
+
+
+def _random_value(rng: random.Random, strings: List[str]):
+    kind = rng.randrange(6)
+    if kind == 0:
+        return rng.randint(-10_000, 10_000)
+    if kind == 1:
+        return round(rng.uniform(-1000, 1000), rng.randint(0, 6))
+    if kind == 2:
+        return rng.choice(strings)  # 같은 문자열을 여러 칸에 써서 공유 문자열 색인을 재사용합니다.
+    if kind == 3:
+        return datetime(2020, 1, 1) + timedelta(days=rng.randint(0, 2000), seconds=rng.choice([0, 3600, 45296]))
+    if kind == 4:
+        return rng.choice([True, False])
+    return f"값 {rng.randint(0, 10**6)}"
+
+
+SHARED_STRINGS_TYPE = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/sharedStrings"
+SHARED_STRINGS_CONTENT = "application/vnd.openxmlformats-officedocument.spreadsheetml.sharedStrings+xml"
+_INLINE_STRING_RE = re.compile(r'<c([^>]*?) t="inlineStr"><is><t[^>]*>(.*?)</t></is></c>', re.S)
+
+
+def _rewrite_package(data: bytes, rng: random.Random) -> bytes:
+    """
+    openpyxl이 만든 파일을 다른 프로그램이 만든 파일처럼 바꿉니다.
+    - 인라인 문자열을 공유 문자열(sharedStrings.xml)로 옮깁니다. (Excel이 저장하는 방식)
+    - 셀 좌표(c의 r)나 행 번호(row의 r)를 지웁니다.
+    """
+    shared, strip_cells, strip_rows = rng.random() < 0.7, rng.random() < 0.3, rng.random() < 0.3
+    strings: Dict[str, int] = {}
+
+    def to_shared(match):
+        index = strings.setdefault(match.group(2), len(strings))
+        return f'<c{match.group(1)} t="s"><v>{index}</v></c>'
+
+    parts = {}
+    with zipfile.ZipFile(BytesIO(data)) as src:
+        for name in src.namelist():
+            parts[name] = src.read(name)
+    for name in [n for n in parts if n.startswith("xl/worksheets/sheet")]:
+        xml = parts[name].decode("utf-8")
+        if shared:
+            xml = _INLINE_STRING_RE.sub(to_shared, xml)
+        if strip_cells:
+            xml = re.sub(r'(<c[^>]*?) r="[A-Z]+[0-9]+"', r"\1", xml)
+        if strip_rows:
+            xml = re.sub(r'(<row[^>]*?) r="[0-9]+"', r"\1", xml)
+        parts[name] = xml.encode("utf-8")
+    if strings:
+        items = "".join(f'<si><t xml:space="preserve">{text}</t></si>' for text in strings)
+        parts["xl/sharedStrings.xml"] = (
+            '<sst xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+            f'count="{len(strings)}" uniqueCount="{len(strings)}">{items}</sst>'
+        ).encode("utf-8")
+        rels = parts["xl/_rels/workbook.xml.rels"].decode("utf-8")
+        parts["xl/_rels/workbook.xml.rels"] = rels.replace(
+            "</Relationships>",
+            f'<Relationship Id="rIdShared" Type="{SHARED_STRINGS_TYPE}" Target="sharedStrings.xml"/></Relationships>',
+        ).encode("utf-8")
+        types = parts["[Content_Types].xml"].decode("utf-8")
+        parts["[Content_Types].xml"] = types.replace(
+            "</Types>",
+            f'<Override PartName="/xl/sharedStrings.xml" ContentType="{SHARED_STRINGS_CONTENT}"/></Types>',
+        ).encode("utf-8")
+
+    output = BytesIO()
+    with zipfile.ZipFile(output, "w", zipfile.ZIP_DEFLATED) as dst:
+        for name, content in parts.items():
+            dst.writestr(name, content)
+    return output.getvalue()
+
+
+def random_workbook(rng: random.Random) -> bytes:
+    wb = Workbook()
+    wb.remove(wb.active)
+    if rng.random() < 0.2:
+        wb.epoch = CALENDAR_MAC_1904
+    strings = [f"항목{i}" for i in range(rng.randint(1, 8))] + [" 공백 ", "O", "X"]
+    for s in range(rng.randint(1, 3)):
+        ws = wb.create_sheet(f"S{s + 1}")
+        for (r, c) in random_grid(rng):
+            ws.cell(r, c, _random_value(rng, strings))
+    buffer = BytesIO()
+    wb.save(buffer)
+    data = buffer.getvalue()
+    return _rewrite_package(data, rng)
+
+
+def _same_cell(a, b) -> bool:
+    a = None if a is None or (not isinstance(a, str) and pd.isna(a)) else a
+    b = None if b is None or (not isinstance(b, str) and pd.isna(b)) else b
+    if a is None or b is None:
+        return a is None and b is None
+    return a == b
+
+
+def _table_differences(expected: pd.DataFrame, actual: pd.DataFrame) -> List[str]:
+    actual = with_header(actual)
+    if expected.shape != actual.shape:
+        return [f"크기 {expected.shape} / {actual.shape}"]
+    return [
+        f"({i}, {j}) {expected.iat[i, j]!r} / {actual.iat[i, j]!r}"
+        for i in range(expected.shape[0])
+        for j in range(expected.shape[1])
+        if not _same_cell(expected.iat[i, j], actual.iat[i, j])
+    ][:3]
+
+
+def check_process_xlsx(n_workbooks: int, seed: int) -> int:
+    rng = random.Random(seed)
+    failures = 0
+    for i in range(n_workbooks):
+        data = random_workbook(rng)
+        expected = reference_process_xlsx(data)
+        for reader in XLSX_READERS:
+            actual = process_xlsx_file(BytesIO(data), reader=reader)
+            problems = []
+            if list(actual) != list(expected):
+                problems.append(f"시트 {list(expected)} / {list(actual)}")
+            for sheet_name in expected:
+                exp_dfs, act_dfs = expected[sheet_name], actual.get(sheet_name, [])
+                if len(exp_dfs) != len(act_dfs):
+                    problems.append(f"{sheet_name}: 표 {len(exp_dfs)}개 / {len(act_dfs)}개")
+                    continue
+                for index, (exp_df, act_df) in enumerate(zip(exp_dfs, act_dfs)):
+                    problems += [f"{sheet_name}[{index}] {d}" for d in _table_differences(exp_df, act_df)]
+            if problems:
+                failures += 1
+                if failures <= MAX_REPORTED:
+                    print(f"[process_xlsx_file] 통합 문서 {i}, 리더 {reader}: " + "; ".join(problems[:5]))
+    print(f"process_xlsx_file: 통합 문서 {n_workbooks}개 x 리더 {len(XLSX_READERS)}개 중 {failures}개 불일치")
+    return failures
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="표 탐지/추출 동등성 검사")
+    parser.add_argument("--grids", type=int, default=3000, help="find_tables에 넣을 무작위 그리드 수")
+    parser.add_argument("--workbooks", type=int, default=40, help="process_xlsx_file에 넣을 무작위 통합 문서 수")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    failures = check_find_tables(args.grids, args.seed)
+    failures += check_process_xlsx(args.workbooks, args.seed)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,148 @@
+"""
+Gemini REST API(generateContent / streamGenerateContent)를 흉내 내는 로컬 서버.
+속도 제한과 일시적 오류를 재현해 rate_limit.ModelClientPool을 실제 클라이언트로 시험할 때 씁니다.
+
+    python -m benchmarks.fake_gemini_server --port 8765 --rpm 30 --error-rate 0.1
+    GEMINI_BASE_URL=http://127.0.0.1:8765 GOOGLE_API_KEY=fake streamlit run app.py
+
+입력 데이터의 줄마다 스키마 열을 채운 행을 하나씩 돌려줍니다.
+"""
+import argparse
+import ast
+import hashlib
+import json
+import random
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeGeminiState:
+    def __init__(self, rpm: int = 0, error_rate: float = 0.0, latency_ms: float = 0.0, seed: int = 0):
+        self.rpm = rpm
+        self.error_rate = error_rate
+        self.latency_ms = latency_ms
+        self.rng = random.Random(seed)
+        self.requests = deque()
+        self.counts = {"ok": 0, "429": 0, "503": 0}
+        self.lock = threading.Lock()
+
+    def admit(self) -> int:
+        """이번 요청에 돌려줄 상태 코드"""
+        with self.lock:
+            now = time.monotonic()
+            while self.requests and now - self.requests[0] >= 60:
+                self.requests.popleft()
+            if self.rpm and len(self.requests) >= self.rpm:
+                status = 429
+            elif self.rng.random() < self.error_rate:
+                status = self.rng.choice([429, 503])
+            else:
+                status = 200
+                self.requests.append(now)
+            self.counts["ok" if status == 200 else str(status)] += 1
+            return status
+
+
+def _rows_for_prompt(prompt: str) -> list:
+    keys_line = next((line for line in prompt.splitlines() if line.startswith("열 이름(키):")), "")
+    keys = ast.literal_eval(keys_line.split(":", 1)[1].strip()) if keys_line else ["value"]
+    data = prompt.split("입력 데이터:\n", 1)[-1]
+    rows = []
+    for line in data.splitlines():
+        if line.strip():
+            digest = hashlib.sha256(line.encode("utf-8")).hexdigest()[:8]
+            rows.append({key: f"{line.strip()[:20]} {key} {digest}" for key in keys})
+    return rows
+
+
+def _response(text: str, prompt: str) -> dict:
+    prompt_tokens = len(prompt.encode("utf-8")) // 4 + 1
+    output_tokens = len(text.encode("utf-8")) // 4 + 1
+    return {
+        "candidates": [{"content": {"role": "model", "parts": [{"text": text}]}, "finishReason": "STOP", "index": 0}],
+        "usageMetadata": {
+            "promptTokenCount": prompt_tokens,
+            "candidatesTokenCount": output_tokens,
+            "totalTokenCount": prompt_tokens + output_tokens,
+        },
+    }
+
+
+def make_handler(state: FakeGeminiState):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send_json(self, status: int, body: dict):
+            data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            status = state.admit()
+            if state.latency_ms:
+                time.sleep(state.latency_ms / 1000)
+            if status != 200:
+                reason = "RESOURCE_EXHAUSTED" if status == 429 else "UNAVAILABLE"
+                self._send_json(status, {"error": {"code": status, "message": "fake error", "status": reason}})
+                return
+
+            prompt = "".join(part.get("text", "") for c in body.get("contents", []) for part in c.get("parts", []))
+            text = json.dumps(_rows_for_prompt(prompt), ensure_ascii=False)
+            if ":streamGenerateContent" not in self.path:
+                self._send_json(200, _response(text, prompt))
+                return
+
+            # SSE로 응답을 몇 조각으로 나눠 보냅니다.
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            step = max(len(text) // 4, 1)
+            for i in range(0, len(text), step):
+                chunk = _response(text[i:i + step], prompt)
+                self.wfile.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\r\n\r\n".encode("utf-8"))
+                self.wfile.flush()
+            self.close_connection = True
+
+    return Handler
+
+
+def serve(host: str = "127.0.0.1", port: int = 0, **options):
+    """서버를 백그라운드 스레드에서 띄우고 (server, state)를 돌려줍니다. port=0이면 빈 포트를 고릅니다."""
+    state = FakeGeminiState(**options)
+    server = ThreadingHTTPServer((host, port), make_handler(state))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, state
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="로컬 가짜 Gemini 서버")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--rpm", type=int, default=0, help="분당 허용 요청 수 (넘으면 429, 0이면 무제한)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="무작위 429/503 응답 비율")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="요청마다 더하는 지연")
+    args = parser.parse_args(argv)
+
+    server, state = serve(args.host, args.port, rpm=args.rpm, error_rate=args.error_rate, latency_ms=args.latency_ms)
+    print(f"http://{args.host}:{server.server_address[1]} 에서 대기 중 (Ctrl+C로 종료)")
+    try:
+        while True:
+            time.sleep(10)
+            print(state.counts)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
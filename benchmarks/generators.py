@@ -0,0 +1,80 @@
+import random
+from datetime import datetime, timedelta
+from io import BytesIO
+
+from docx import Document
+from openpyxl import Workbook
+
+_WORDS = [
+    "계약", "기간", "담당자", "금액", "지급", "조건", "납품", "검수", "하자", "보증",
+    "위약금", "해지", "통지", "비밀", "유지", "분쟁", "관할", "법원", "서명", "날인",
+]
+
+
+def _cell_value(rng: random.Random, col: int):
+    kind = col % 4
+    if kind == 0:
+        return rng.randint(0, 1_000_000)
+    if kind == 1:
+        return round(rng.uniform(0, 10_000), 2)
+    if kind == 2:
+        return rng.choice(["O", "X", "보류", "완료"])
+    return datetime(2024, 1, 1) + timedelta(days=rng.randint(0, 365))
+
+
+def generate_xlsx(
+    sheets: int = 1,
+    tables_per_sheet: int = 10,
+    rows: int = 100,
+    cols: int = 8,
+    sparsity: float = 0.0,
+    seed: int = 0,
+) -> bytes:
+    """
+    벤치마크용 xlsx 파일을 만듭니다.
+    시트마다 표 tables_per_sheet개를 두 줄로 나란히 배치하고, 표마다 제목 행과 머리글 행을 둡니다.
+    sparsity는 표 안의 데이터 칸이 비어 있을 확률입니다. (첫 열은 항상 채워 표가 끊기지 않게 합니다)
+    """
+    rng = random.Random(seed)
+    wb = Workbook(write_only=True)
+    gap = 2
+    for s in range(sheets):
+        ws = wb.create_sheet(f"Sheet{s + 1}")
+        for band in range(0, tables_per_sheet, 2):
+            n_side = min(2, tables_per_sheet - band)
+            block = [[None] * ((cols + gap) * n_side) for _ in range(rows + 2)]
+            for t in range(n_side):
+                offset = t * (cols + gap)
+                block[0][offset] = f"표 {s + 1}-{band + t + 1}"
+                for c in range(cols):
+                    block[1][offset + c] = f"항목{c + 1}"
+                for r in range(rows):
+                    block[r + 2][offset] = f"데이터{r + 1}"
+                    for c in range(1, cols):
+                        if rng.random() >= sparsity:
+                            block[r + 2][offset + c] = _cell_value(rng, c)
+            for row in block:
+                ws.append(row)
+            for _ in range(gap):
+                ws.append([])
+    buffer = BytesIO()
+    wb.save(buffer)
+    return buffer.getvalue()
+
+
+def generate_docx(paragraphs: int = 1000, words_per_paragraph: int = 30, heading_every: int = 20, seed: int = 0) -> bytes:
+    """
+    벤치마크용 docx 파일. heading_every 문단마다 빈 문단과 '제N조' 제목 문단을 넣어
+    process_docx_file이 나누는 묶음(chunk)이 생기게 합니다.
+    """
+    rng = random.Random(seed)
+    doc = Document()
+    for i in range(paragraphs):
+        if heading_every and i % heading_every == 0:
+            if i:
+                doc.add_paragraph("")
+            doc.add_paragraph(f"제{i // heading_every + 1}조")
+        doc.add_paragraph(" ".join(rng.choice(_WORDS) for _ in range(words_per_paragraph)))
+    buffer = BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
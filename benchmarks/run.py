@@ -0,0 +1,210 @@
+"""
+파서 벤치마크.
+
+    python -m benchmarks.run                      # 기본 시나리오 측정
+    python -m benchmarks.run --save-baseline      # 결과를 기준값으로 저장
+    python -m benchmarks.run --scenario large     # 기준값과 비교, 느려지면 종료 코드 1
+
+단계별로 실행 시간(중앙값)과 최대 메모리(tracemalloc)를 기록합니다.
+화면 모듈(streamlit_utils)을 새 인터프리터에서 가져오는 콜드 스타트 시간도 함께 잽니다.
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from io import BytesIO
+
+import pandas as pd
+
+from benchmarks.generators import generate_docx, generate_xlsx
+from data_utils import (
+    extract_blocks,
+    find_tables,
+    process_docx_file,
+    process_xlsx_file,
+    split_block_on_first_row,
+)
+from xlsx_readers import read_xlsx_xml
+
+SCENARIOS = {
+    "small": {
+        "xlsx": dict(sheets=1, tables_per_sheet=6, rows=50, cols=6),
+        "docx": dict(paragraphs=300),
+    },
+    "default": {
+        "xlsx": dict(sheets=3, tables_per_sheet=20, rows=200, cols=8, sparsity=0.1),
+        "docx": dict(paragraphs=3000),
+    },
+    "large": {
+        "xlsx": dict(sheets=5, tables_per_sheet=40, rows=500, cols=12, sparsity=0.2),
+        "docx": dict(paragraphs=20000),
+    },
+}
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 화면 모듈을 가져올 때 함께 가져오면 안 되는 무거운 의존성 (처음 쓸 때 가져옵니다)
+DEFERRED_MODULES = ("google.genai", "pydantic", "openpyxl", "docx")
+
+
+def import_streamlit_utils() -> int:
+    """
+    새 인터프리터에서 streamlit_utils를 가져옵니다. (서버 시작/콜드 스타트 비용)
+    항목 수는 미리 가져온 DEFERRED_MODULES 수라서 0이 아니면 기준값 비교에서 걸립니다.
+    """
+    code = f"import sys, streamlit_utils; print(sum(m in sys.modules for m in {DEFERRED_MODULES!r}))"
+    result = subprocess.run(
+        [sys.executable, "-c", code], cwd=REPO_ROOT, capture_output=True, text=True, check=True
+    )
+    return int(result.stdout.split()[-1])
+
+
+def build_stages(xlsx_bytes: bytes, docx_bytes: bytes, workers: int):
+    """(단계 이름, 함수) 목록. 함수는 처리한 항목 수를 돌려줍니다."""
+    sheets = list(read_xlsx_xml(BytesIO(xlsx_bytes)))
+    # 가장 큰 시트 하나로 탐지/추출 단계를 따로 잽니다.
+    # process_sheet와 같은 경로(extract_blocks -> split_block_on_first_row)를 잽니다.
+    _, cells = max(sheets, key=lambda item: len(item[1]))
+    regions = find_tables(cells)
+    blocks = extract_blocks(cells, regions)
+
+    def read_workbook():
+        return sum(len(cells) for _, cells in read_xlsx_xml(BytesIO(xlsx_bytes)))
+
+    def extract_tables():
+        return len(extract_blocks(cells, regions))
+
+    def split_tables():
+        return sum(len(split_block_on_first_row(block)) for block in blocks)
+
+    def xlsx_file():
+        result = process_xlsx_file(BytesIO(xlsx_bytes), max_workers=workers)
+        return sum(len(dfs) for dfs in result.values())
+
+    return [
+        ("xlsx.read_workbook", read_workbook),
+        ("xlsx.find_tables", lambda: len(find_tables(cells))),
+        ("xlsx.extract_table", extract_tables),
+        ("xlsx.split_block_on_first_row", split_tables),
+        ("xlsx.process_xlsx_file", xlsx_file),
+        ("docx.process_docx_file", lambda: len(process_docx_file(BytesIO(docx_bytes)))),
+        ("import.streamlit_utils", import_streamlit_utils),
+    ]
+
+
+def measure(fn, repeat: int) -> dict:
+    times = []
+    items = 0
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        items = fn()
+        times.append(time.perf_counter() - start)
+
+    # 메모리는 tracemalloc이 실행 시간을 늘리므로 한 번 더 따로 실행해 잽니다.
+    gc.collect()
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "seconds": statistics.median(times),
+        "min_seconds": min(times),
+        "peak_mb": peak / (1024 * 1024),
+        "items": items,
+    }
+
+
+def run(scenario: str, repeat: int, workers: int) -> dict:
+    config = SCENARIOS[scenario]
+    xlsx_bytes = generate_xlsx(**config["xlsx"])
+    docx_bytes = generate_docx(**config["docx"])
+    results = {}
+    for name, fn in build_stages(xlsx_bytes, docx_bytes, workers):
+        results[name] = measure(fn, repeat)
+        r = results[name]
+        print(f"{name:<32} {r['seconds'] * 1000:10.1f} ms {r['peak_mb']:10.1f} MB {r['items']:>8} items")
+    return {
+        "scenario": scenario,
+        "repeat": repeat,
+        "workers": workers,
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "stages": results,
+    }
+
+
+def compare(current: dict, baseline: dict, time_tolerance: float, memory_tolerance: float) -> list:
+    """기준값보다 허용 범위 이상 느려지거나 메모리를 더 쓴 단계 목록을 돌려줍니다."""
+    regressions = []
+    for name, cur in current["stages"].items():
+        base = baseline["stages"].get(name)
+        if base is None:
+            continue
+        if cur["items"] != base["items"]:
+            regressions.append(f"{name}: 결과 개수 변경 {base['items']} -> {cur['items']}")
+        if cur["seconds"] > base["seconds"] * (1 + time_tolerance):
+            regressions.append(
+                f"{name}: 시간 {base['seconds'] * 1000:.1f} ms -> {cur['seconds'] * 1000:.1f} ms"
+            )
+        if cur["peak_mb"] > base["peak_mb"] * (1 + memory_tolerance):
+            regressions.append(f"{name}: 메모리 {base['peak_mb']:.1f} MB -> {cur['peak_mb']:.1f} MB")
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="docx/xlsx 파서 벤치마크")
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS), default="default")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=1, help="process_xlsx_file의 시트 병렬 워커 수")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="기준값 JSON 경로")
+    parser.add_argument("--save-baseline", action="store_true", help="이번 결과를 기준값으로 저장")
+    parser.add_argument("--time-tolerance", type=float, default=0.2, help="허용하는 시간 증가 비율")
+    parser.add_argument("--memory-tolerance", type=float, default=0.1, help="허용하는 메모리 증가 비율")
+    parser.add_argument("--output", help="이번 결과를 JSON으로 저장할 경로")
+    args = parser.parse_args(argv)
+
+    current = run(args.scenario, args.repeat, args.workers)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(current, f, ensure_ascii=False, indent=2)
+
+    if args.save_baseline:
+        baselines = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline, encoding="utf-8") as f:
+                baselines = json.load(f)
+        baselines[args.scenario] = current
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(baselines, f, ensure_ascii=False, indent=2)
+        print(f"기준값 저장: {args.baseline} [{args.scenario}]")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("기준값이 없어 비교하지 않습니다. (--save-baseline으로 저장)")
+        return 0
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f).get(args.scenario)
+    if baseline is None:
+        print(f"'{args.scenario}' 시나리오의 기준값이 없습니다.")
+        return 0
+
+    regressions = compare(current, baseline, args.time_tolerance, args.memory_tolerance)
+    if regressions:
+        print("❌ 성능 저하:")
+        for line in regressions:
+            print(f"  - {line}")
+        return 1
+    print("✅ 기준값 대비 성능 저하 없음")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
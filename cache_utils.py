@@ -0,0 +1,158 @@
+import hashlib
+import os
+import pickle
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Callable, Optional
+
+
+def content_digest(data: bytes) -> str:
+    """파일 내용의 sha256 해시 (캐시 키 용도)"""
+    return hashlib.sha256(data).hexdigest()
+
+
+class ByteLRUCache:
+    """
+    값을 pickle 바이트로 보관하는 LRU 캐시.
+    - max_bytes: 메모리에 보관할 최대 바이트 수
+    - spill_dir: 지정하면 메모리에서 밀려난 항목을 디스크에 저장해 두었다가 다시 읽습니다.
+    - max_disk_bytes: 디스크에 보관할 최대 바이트 수 (오래 쓰지 않은 파일부터 삭제)
+    - write_through: True면 set() 할 때 바로 디스크에도 기록해 서버를 재시작해도 유지됩니다.
+
+    값을 바이트로 보관하므로 get()은 매번 새 객체를 돌려줍니다.
+    (호출한 쪽에서 DataFrame 등을 수정해도 캐시에는 영향이 없습니다.)
+    """
+
+    def __init__(
+        self,
+        max_bytes: int,
+        spill_dir: Optional[str] = None,
+        max_disk_bytes: Optional[int] = None,
+        write_through: bool = False,
+    ):
+        self.max_bytes = max_bytes
+        self.spill_dir = spill_dir
+        self.max_disk_bytes = max_disk_bytes
+        self.write_through = write_through and bool(spill_dir)
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        if spill_dir:
+            os.makedirs(spill_dir, exist_ok=True)
+
+    def _spill_path(self, key: str) -> str:
+        return os.path.join(self.spill_dir, hashlib.sha256(key.encode()).hexdigest() + ".pkl")
+
+    def _store(self, key: str, blob: bytes):
+        if key in self._entries:
+            self._size -= len(self._entries.pop(key))
+        if len(blob) > self.max_bytes:
+            if not self.write_through:
+                self._spill(key, blob)
+            return
+        self._entries[key] = blob
+        self._size += len(blob)
+        while self._size > self.max_bytes:
+            old_key, old_blob = self._entries.popitem(last=False)
+            self._size -= len(old_blob)
+            if not self.write_through:  # write-through면 이미 디스크에 있습니다.
+                self._spill(old_key, old_blob)
+
+    def _spill(self, key: str, blob: bytes):
+        if not self.spill_dir:
+            return
+        path = self._spill_path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(blob)
+        os.replace(tmp_path, path)
+        self._trim_disk()
+
+    def _trim_disk(self):
+        if not self.max_disk_bytes:
+            return
+        files = []
+        for name in os.listdir(self.spill_dir):
+            if name.endswith(".pkl"):
+                path = os.path.join(self.spill_dir, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def _load_spilled(self, key: str) -> Optional[bytes]:
+        if not self.spill_dir:
+            return None
+        path = self._spill_path(key)
+        try:
+            with open(path, "rb") as f:
+                blob = f.read()
+        except FileNotFoundError:
+            return None
+        os.utime(path)  # 최근 사용 표시
+        return blob
+
+    def get(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            blob = self._entries.get(key)
+            if blob is not None:
+                self._entries.move_to_end(key)
+            else:
+                blob = self._load_spilled(key)
+                if blob is not None:
+                    self._store(key, blob)
+            if blob is None:
+                self.misses += 1
+                return default
+            self.hits += 1
+        return pickle.loads(blob)
+
+    def set(self, key: str, value: Any):
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            if self.write_through:
+                self._spill(key, blob)
+            self._store(key, blob)
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            return key in self._entries or (
+                bool(self.spill_dir) and os.path.exists(self._spill_path(key))
+            )
+
+    @property
+    def size_bytes(self) -> int:
+        return self._size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+
+# ✅ 서버 프로세스 전체(모든 Streamlit 세션)가 공유하는 파싱 결과 캐시
+@lru_cache(maxsize=None)
+def get_parse_cache() -> ByteLRUCache:
+    return ByteLRUCache(
+        max_bytes=int(os.getenv("PARSE_CACHE_MAX_MB", "256")) * 1024 * 1024,
+        spill_dir=os.getenv("PARSE_CACHE_DIR") or None,
+        max_disk_bytes=int(os.getenv("PARSE_CACHE_DISK_MAX_MB", "2048")) * 1024 * 1024,
+    )
+
+
+def parse_cache_key(parser: Callable, version: str, digest: str) -> str:
+    return f"{parser.__module__}.{parser.__name__}:{version}:{digest}"
+
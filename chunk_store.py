@@ -0,0 +1,77 @@
+import hashlib
+from typing import Dict, Iterable, List, Optional
+
+
+def chunk_id(kind: str, content: str) -> str:
+    """항목 종류와 내용으로 만든 id. 같은 내용은 어느 파일에서 몇 번을 올려도 같은 id가 됩니다."""
+    digest = hashlib.sha256(f"{kind}\x00{content}".encode("utf-8")).hexdigest()[:16]
+    return f"{kind}_{digest}"
+
+
+def unique_items(items: Iterable[dict]) -> List[dict]:
+    """같은 id(=같은 내용)의 항목은 처음 것만 남깁니다. (프롬프트에 같은 문단을 두 번 넣지 않도록)"""
+    seen = set()
+    unique = []
+    for item in items:
+        if item["id"] not in seen:
+            seen.add(item["id"])
+            unique.append(item)
+    return unique
+
+
+class ChunkStore:
+    """
+    data_list 항목을 내용 해시 id로 한 번만 보관하고, 파일마다 그 id 목록(참조)만 둡니다.
+    수백 개 계약서에 반복되는 머리말/면책 문구도 항목 하나로 합쳐집니다.
+    """
+
+    def __init__(self):
+        self.chunks: Dict[str, dict] = {}
+        # 파일 키 -> 문서 순서대로의 id 목록 (중복 가능)
+        # 파일 키는 업로드마다 고유해야 합니다. 다른 폴더의 같은 이름 파일도 따로 보관하도록
+        # 화면에서는 "업로드 순서:파일 이름"을 씁니다.
+        self.refs: Dict[str, List[str]] = {}
+        self.names: Dict[str, str] = {}  # 파일 키 -> 표시할 파일 이름
+        self._sources: Dict[str, List[str]] = {}  # id -> 그 항목이 들어 있는 파일 키들
+
+    def __len__(self) -> int:
+        return len(self.chunks)
+
+    def add_file(self, file_key: str, items: Iterable[dict], name: Optional[str] = None) -> List[str]:
+        """파일 하나의 항목을 넣습니다. 같은 파일 키로 다시 넣으면 이전 참조를 바꿉니다."""
+        if file_key in self.refs:
+            self.remove_file(file_key)
+        self.names[file_key] = name or file_key
+        ids = []
+        for item in items:
+            item_id = item["id"]
+            if item_id not in self.chunks:
+                self.chunks[item_id] = item
+                self._sources[item_id] = []
+            if file_key not in self._sources[item_id]:
+                self._sources[item_id].append(file_key)
+            ids.append(item_id)
+        self.refs[file_key] = ids
+        return ids
+
+    def remove_file(self, file_key: str):
+        """파일의 참조를 지우고, 더 이상 어느 파일도 참조하지 않는 항목은 버립니다."""
+        self.names.pop(file_key, None)
+        for item_id in dict.fromkeys(self.refs.pop(file_key, [])):
+            sources = self._sources[item_id]
+            sources.remove(file_key)
+            if not sources:
+                del self._sources[item_id]
+                del self.chunks[item_id]
+
+    def sources(self, item_id: str) -> List[str]:
+        """항목이 들어 있는 파일들의 이름"""
+        return [self.names[file_key] for file_key in self._sources.get(item_id, [])]
+
+    def items(self) -> List[dict]:
+        """중복 없는 항목 목록 (처음 나온 순서)"""
+        return list(self.chunks.values())
+
+    def file_items(self, file_key: str) -> List[dict]:
+        """파일 하나의 항목을 문서 순서대로 (반복된 항목도 그대로) 돌려줍니다."""
+        return [self.chunks[item_id] for item_id in self.refs.get(file_key, [])]
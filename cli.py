@@ -0,0 +1,293 @@
+"""
+Streamlit 없이 여러 문서를 한꺼번에 처리하는 명령줄 도구.
+
+    # 폴더 안의 docx/xlsx에서 문단과 표를 추출해 JSONL(또는 .parquet)로 저장
+    python cli.py extract ./docs ./sheets -o extracted.jsonl
+
+    # 문서마다 target.xlsx의 표를 채워 결과 행을 JSONL로 저장
+    python cli.py fill ./contracts --target target.xlsx --table "Sheet1:2" -o filled.jsonl
+
+결과는 처리되는 대로 한 줄씩 기록하므로 중간에 멈춰도 그때까지의 결과가 남습니다.
+"""
+import argparse
+import json
+import os
+import sys
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+import pandas as pd
+
+from chunk_store import unique_items
+from config import get_settings
+from data_utils import PARSER_VERSION, process_docx_file, process_xlsx_file
+from llm_utils import DEFAULT_MODEL, fill_table, table_keys
+from parallel_utils import default_worker_count, ingest_files
+from retrieval import BM25Index, auto_select_items
+from table_types import table_shape, with_header
+
+PARSERS = {
+    ".docx": process_docx_file,
+    ".xlsx": process_xlsx_file,
+}
+
+# Parquet는 레코드 종류마다 필드가 달라 공통 열만 두고, 나머지 값은 data 열에 JSON으로 넣습니다.
+PARQUET_COLUMNS = ["kind", "file", "sheet", "table_index", "item_id", "label", "data"]
+
+
+def iter_input_files(paths: Iterable[str], suffixes: Tuple[str, ...]) -> Iterator[str]:
+    """파일/폴더 경로에서 suffixes 확장자 파일을 이름 순으로 찾습니다. (폴더는 하위 폴더까지)"""
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                for name in sorted(files):
+                    if name.lower().endswith(suffixes) and not name.startswith("~$"):
+                        yield os.path.join(root, name)
+        elif path.lower().endswith(suffixes):
+            yield path
+
+
+def _chunks(items: Iterable, size: int) -> Iterator[list]:
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def parse_files(paths: Iterable[str], workers: int) -> Iterator[Tuple[str, object, Optional[BaseException]]]:
+    """
+    파일들을 프로세스 풀에서 파싱해 (경로, 결과, 오류)를 끝나는 순서대로 내보냅니다.
+    한 번에 workers * 4개씩만 읽어 수천 개의 파일도 메모리에 한꺼번에 올리지 않습니다.
+    """
+    for chunk in _chunks(paths, workers * 4):
+        for suffix, parser in PARSERS.items():
+            group = [path for path in chunk if path.lower().endswith(suffix)]
+            if not group:
+                continue
+            files = []
+            for path in group:
+                with open(path, "rb") as f:
+                    files.append((path, f.read()))
+            for item in ingest_files(parser, files, PARSER_VERSION, max_workers=workers):
+                yield item.name, item.result, item.error
+
+
+def _table_values(df: pd.DataFrame) -> list:
+    return df.astype(object).where(df.notna(), None).values.tolist()
+
+
+def extract_records(path: str, result) -> Iterator[dict]:
+    if isinstance(result, dict):  # xlsx: 시트 이름 -> 표 목록
+        for sheet_name, dfs in result.items():
+            for table_index, df in enumerate(dfs):
+                yield {
+                    "kind": "text" if table_shape(df) == (1, 1) else "table",
+                    "file": path,
+                    "sheet": sheet_name,
+                    "table_index": table_index,
+                    "data": _table_values(with_header(df)),
+                }
+    else:  # docx: data_list 항목 목록
+        for item in result:
+            yield {
+                "kind": item["type"],
+                "file": path,
+                "item_id": item["id"],
+                "label": item["label"],
+                # 이미지는 참조(해시, 이름, 크기)만 기록합니다.
+                "data": item["content"]._asdict() if item["type"] == "image" else item["content"],
+            }
+
+
+class RecordWriter:
+    """레코드를 .jsonl 또는 .parquet 파일(확장자로 결정)에 조금씩 나눠 기록합니다. 경로가 '-'면 표준 출력."""
+
+    def __init__(self, path: str, batch_size: int = 1000):
+        self.path = path
+        self.batch_size = batch_size
+        self.count = 0
+        self._batch = []
+        self._parquet = None
+        if path.endswith(".parquet"):
+            import pyarrow as pa  # Parquet 출력을 쓸 때만 필요합니다.
+            import pyarrow.parquet as pq
+
+            self._schema = pa.schema([
+                ("kind", pa.string()), ("file", pa.string()), ("sheet", pa.string()),
+                ("table_index", pa.int64()), ("item_id", pa.string()), ("label", pa.string()),
+                ("data", pa.string()),
+            ])
+            self._parquet = pq.ParquetWriter(path, self._schema)
+            self._file = None
+        else:
+            self._file = sys.stdout if path == "-" else open(path, "w", encoding="utf-8")
+
+    def write(self, record: dict):
+        self.count += 1
+        if self._parquet is None:
+            self._file.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+            self._file.flush()
+            return
+        row = {key: record.get(key) for key in PARQUET_COLUMNS}
+        row["data"] = json.dumps(record.get("data"), ensure_ascii=False, default=str)
+        self._batch.append(row)
+        if len(self._batch) >= self.batch_size:
+            self._flush()
+
+    def _flush(self):
+        import pyarrow as pa
+
+        if self._batch:
+            self._parquet.write_table(pa.Table.from_pylist(self._batch, schema=self._schema))
+            self._batch = []
+
+    def close(self):
+        if self._parquet is not None:
+            self._flush()
+            self._parquet.close()
+        elif self._file is not sys.stdout:
+            self._file.close()
+
+
+def load_target_tables(path: str, selectors: List[str]) -> List[Tuple[str, int, pd.DataFrame]]:
+    """
+    채울 대상 표 목록. selectors는 "시트:표 번호" 형식이며 (표 번호는 process_xlsx_file 결과의 인덱스)
+    비어 있으면 텍스트(1x1)가 아닌 모든 표를 대상으로 합니다.
+    """
+    with open(path, "rb") as f:
+        sheets = process_xlsx_file(f)
+    if not selectors:
+        return [
+            (sheet_name, index, df)
+            for sheet_name, dfs in sheets.items()
+            for index, df in enumerate(dfs)
+            if table_shape(df) != (1, 1)
+        ]
+    tables = []
+    for selector in selectors:
+        sheet_name, _, index = selector.rpartition(":")
+        if sheet_name not in sheets or not index.isdigit() or int(index) >= len(sheets[sheet_name]):
+            raise SystemExit(f"대상 표를 찾을 수 없습니다: {selector}")
+        tables.append((sheet_name, int(index), sheets[sheet_name][int(index)]))
+    return tables
+
+
+def fill_document(
+    data_list: List[dict], keys: List[str], model: str, top_k: int, token_budget: int
+) -> pd.DataFrame:
+    """문서 하나의 문단으로 표를 채웁니다. top_k가 있으면 열 이름과 관련된 문단만 씁니다."""
+    items = unique_items(item for item in data_list if item["type"] == "text")
+    if top_k:
+        index = BM25Index()
+        index.add_items(items)
+        items, _ = auto_select_items(items, index, " ".join(keys), k=top_k, token_budget=token_budget)
+    return fill_table(keys, [item["content"] for item in items], model=model)
+
+
+def run_extract(args) -> int:
+    writer = RecordWriter(args.output)
+    failed = 0
+    try:
+        paths = iter_input_files(args.inputs, tuple(PARSERS))
+        for path, result, error in parse_files(paths, args.workers):
+            if error is not None:
+                failed += 1
+                print(f"[오류] {path}: {error}", file=sys.stderr)
+                continue
+            for record in extract_records(path, result):
+                writer.write(record)
+    finally:
+        writer.close()
+    print(f"{writer.count}개 레코드 저장 ({failed}개 파일 실패)", file=sys.stderr)
+    return 1 if failed else 0
+
+
+def _write_filled(writer: RecordWriter, path, sheet_name, table_index, df: pd.DataFrame):
+    keys = df.iloc[0].tolist()
+    for values in df.iloc[1:].itertuples(index=False):
+        writer.write({
+            "kind": "row",
+            "file": path,
+            "sheet": sheet_name,
+            "table_index": table_index,
+            "data": dict(zip(keys, values)),
+        })
+
+
+def run_fill(args) -> int:
+    targets = [(sheet, index, table_keys(df)) for sheet, index, df in load_target_tables(args.target, args.table)]
+    if not targets:
+        raise SystemExit("채울 표가 없습니다.")
+
+    writer = RecordWriter(args.output)
+    pending = deque()
+    failed = 0
+
+    def collect(limit: int):
+        # 먼저 보낸 요청부터 결과를 기록합니다. 대기 중인 요청이 limit개 이하가 될 때까지 기다려
+        # 문서 파싱이 모델 요청보다 너무 앞서 나가 메모리에 쌓이지 않게 합니다.
+        nonlocal failed
+        while len(pending) > limit:
+            path, sheet_name, table_index, future = pending.popleft()
+            try:
+                _write_filled(writer, path, sheet_name, table_index, future.result())
+            except Exception as e:
+                failed += 1
+                print(f"[오류] {path} ({sheet_name}:{table_index}): {e}", file=sys.stderr)
+
+    # 파싱은 프로세스 풀에서, 모델 요청은 I/O 대기라 스레드로 동시에 보냅니다.
+    try:
+        with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+            paths = iter_input_files(args.inputs, (".docx",))
+            for path, data_list, error in parse_files(paths, args.workers):
+                if error is not None:
+                    failed += 1
+                    print(f"[오류] {path}: {error}", file=sys.stderr)
+                    continue
+                for sheet_name, table_index, keys in targets:
+                    future = executor.submit(
+                        fill_document, data_list, keys, args.model, args.top_k, args.token_budget
+                    )
+                    pending.append((path, sheet_name, table_index, future))
+                collect(args.concurrency * 2)
+            collect(0)
+    finally:
+        writer.close()
+    print(f"{writer.count}개 행 저장 ({failed}개 실패)", file=sys.stderr)
+    return 1 if failed else 0
+
+
+def main(argv=None) -> int:
+    get_settings()  # .env 읽기
+    parser = argparse.ArgumentParser(description="docx/xlsx 일괄 추출 및 표 채우기")
+    parser.add_argument("--workers", type=int, default=default_worker_count(), help="파싱 프로세스 수")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    extract = sub.add_parser("extract", help="문단과 표를 추출합니다")
+    extract.add_argument("inputs", nargs="+", help="docx/xlsx 파일 또는 폴더")
+    extract.add_argument("-o", "--output", default="-", help=".jsonl 또는 .parquet 경로 (기본: 표준 출력)")
+    extract.set_defaults(func=run_extract)
+
+    fill = sub.add_parser("fill", help="문서마다 대상 표를 채웁니다")
+    fill.add_argument("inputs", nargs="+", help="docx 파일 또는 폴더")
+    fill.add_argument("--target", required=True, help="채울 표가 있는 xlsx 파일")
+    fill.add_argument("--table", action="append", default=[], help='"시트:표 번호" (여러 번 지정 가능, 기본: 모든 표)')
+    fill.add_argument("--model", default=DEFAULT_MODEL)
+    fill.add_argument("--concurrency", type=int, default=4, help="동시에 보낼 표 채우기 요청 수")
+    fill.add_argument("--top-k", type=int, default=0, help="관련 문단만 보낼 때 고를 문단 수 (0이면 전체)")
+    fill.add_argument("--token-budget", type=int, default=4000, help="--top-k로 고른 문단의 토큰 예산")
+    fill.add_argument("-o", "--output", default="-", help=".jsonl 또는 .parquet 경로 (기본: 표준 출력)")
+    fill.set_defaults(func=run_fill)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,27 @@
+import os
+from dataclasses import dataclass
+from functools import lru_cache
+
+from dotenv import load_dotenv
+
+
+@dataclass(frozen=True)
+class Settings:
+    """화면 설정. 나머지 모듈의 환경 변수는 처음 쓰일 때 각자 읽습니다. (README 설정 표 참고)"""
+    retrieval_top_k: int
+    retrieval_token_budget: int
+    xlsx_preview_rows: int
+
+
+@lru_cache(maxsize=None)
+def get_settings() -> Settings:
+    """
+    .env를 한 번만 읽고 설정을 만듭니다. 다른 모듈이 환경 변수를 읽기 전에
+    진입점(app.py, cli.py)에서 먼저 호출합니다.
+    """
+    load_dotenv()
+    return Settings(
+        retrieval_top_k=int(os.getenv("RETRIEVAL_TOP_K", "20")),
+        retrieval_token_budget=int(os.getenv("RETRIEVAL_TOKEN_BUDGET", "4000")),
+        xlsx_preview_rows=int(os.getenv("XLSX_PREVIEW_ROWS", "50")),
+    )
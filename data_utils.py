@@ -1,143 +1,425 @@
-from docx import Document
-from openpyxl import load_workbook
 from io import BytesIO
+import numpy as np
 import pandas as pd
-from typing import List, Tuple, Dict
+from typing import List, Tuple, Dict, Set, Optional, Iterator
+from collections import defaultdict
+from bisect import bisect_left, bisect_right
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+import multiprocessing
+import os
+import posixpath
+import zipfile
+from xml.etree.ElementTree import iterparse
 
+from xlsx_readers import XLSX_READERS, DEFAULT_XLSX_READER, read_part_rels
+from parallel_utils import get_process_pool
+from table_types import compact_dtypes
+from profiling import iter_stage, stage, submit_recorded, unwrap_recorded
+from chunk_store import chunk_id
+from image_utils import ImageRef, store_image
+
+# 파싱 결과 형식이 바뀌면 올려서 캐시된 결과를 무효화합니다. (parallel_utils.ingest_files)
+PARSER_VERSION = "6"
+
+# 이보다 값이 적은 시트는 워커로 보내는 비용이 더 커서 현재 프로세스에서 처리합니다.
+SHEET_PARALLEL_MIN_CELLS = 20_000
+
+# 시트 배열(SheetGrid)의 크기 제한. 사용 범위가 이보다 크고 채워진 셀보다 이 배수 이상 크면
+# 배열을 만들지 않고 표 영역만 따로 읽습니다. (멀리 떨어진 셀 하나로 거대한 배열이 생기지 않도록)
+SHEET_GRID_MAX_CELLS = 4_000_000
+SHEET_GRID_MAX_SPARSITY = 8
+
+
+def default_sheet_workers() -> int:
+    """
+    한 워크북에서 동시에 풀로 보낼 시트 수 (SHEET_WORKERS, 1이면 병렬 처리하지 않음).
+    풀 자체의 크기는 INGEST_WORKERS입니다. 이미 풀 워커 안이라면 중첩 풀을 만들지 않습니다.
+    """
+    if multiprocessing.parent_process() is not None:
+        return 1
+    return int(os.getenv("SHEET_WORKERS", "0")) or os.cpu_count() or 1
+
+
+W_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+# python-docx의 Run.text와 같은 규칙으로 run 내부 요소를 텍스트로 바꿉니다.
+_RUN_TEXT = {
+    f"{W_NS}tab": "\t",
+    f"{W_NS}ptab": "\t",
+    f"{W_NS}cr": "\n",
+    f"{W_NS}noBreakHyphen": "-",
+}
+
+
+def _run_text(run) -> str:
+    parts = []
+    for child in run:
+        tag = child.tag
+        if tag == f"{W_NS}t":
+            parts.append(child.text or "")
+        elif tag == f"{W_NS}br":
+            if child.get(f"{W_NS}type", "textWrapping") == "textWrapping":
+                parts.append("\n")
+        elif tag in _RUN_TEXT:
+            parts.append(_RUN_TEXT[tag])
+    return "".join(parts)
+
+
+def _paragraph_text(p) -> str:
+    """문단 바로 아래의 run과 하이퍼링크 run만 이어 붙입니다. (Paragraph.text와 동일)"""
+    parts = []
+    for child in p:
+        if child.tag == f"{W_NS}r":
+            parts.append(_run_text(child))
+        elif child.tag == f"{W_NS}hyperlink":
+            parts.extend(_run_text(r) for r in child.iterfind(f"{W_NS}r"))
+    return "".join(parts)
+
+
+A_NS = "{http://schemas.openxmlformats.org/drawingml/2006/main}"
+R_NS = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+WP_NS = "{http://schemas.openxmlformats.org/drawingml/2006/wordprocessingDrawing}"
+V_NS = "{urn:schemas-microsoft-com:vml}"
+
+
+def _paragraph_images(p) -> Iterator[Tuple[str, str]]:
+    """문단 안 그림의 (관계 id, 설명)을 차례로 내보냅니다. (DrawingML 그림과 예전 VML 그림)"""
+    for drawing in p.iter(f"{W_NS}drawing"):
+        doc_pr = drawing.find(f".//{WP_NS}docPr")
+        label = (doc_pr.get("descr") or doc_pr.get("name") or "") if doc_pr is not None else ""
+        for blip in drawing.iter(f"{A_NS}blip"):
+            if blip.get(f"{R_NS}embed"):
+                yield blip.get(f"{R_NS}embed"), label
+    for image_data in p.iter(f"{V_NS}imagedata"):
+        if image_data.get(f"{R_NS}id"):
+            yield image_data.get(f"{R_NS}id"), image_data.get("title", "")
 
-# ✅ docx 파일 처리 함수 (문단 추출)
-def process_docx_file(uploaded_file):
-    document = Document(uploaded_file)
 
-    chunks = []
+def iter_docx_paragraphs(uploaded_file) -> Iterator[Tuple[str, List[dict]]]:
+    """
+    word/document.xml을 iterparse 하면서 본문(body) 문단의 (텍스트, 그림 항목 목록)을 차례로 내보냅니다.
+    Document 객체 모델을 만들지 않고, 처리한 문단은 바로 버리므로 메모리가 일정합니다.
+    그림은 바이트를 블롭 저장소에 넣고 항목에는 참조(ImageRef)만 담습니다.
+    """
+    with zipfile.ZipFile(uploaded_file) as archive:
+        document_path = next(
+            (target for rel_type, target in read_part_rels(archive, "").values()
+             if rel_type.endswith("/officeDocument")),
+            "word/document.xml",
+        )
+        rels = None
+        depth = 0
+        body = None
+        with archive.open(document_path) as source:
+            for event, node in iterparse(source, events=("start", "end")):
+                if event == "start":
+                    depth += 1
+                    if depth == 2 and node.tag == f"{W_NS}body":
+                        body = node
+                    continue
+
+                depth -= 1
+                # depth 2: body의 직계 자식 (표 안의 문단 등은 제외)
+                if depth == 2 and body is not None:
+                    if node.tag == f"{W_NS}p":
+                        images = []
+                        for rel_id, label in _paragraph_images(node):
+                            if rels is None:
+                                rels = read_part_rels(archive, document_path)
+                            _, target = rels.get(rel_id, ("", ""))
+                            if target in archive.NameToInfo:
+                                ref = store_image(posixpath.basename(target), archive.read(target))
+                                images.append(_make_image_item(ref, label))
+                        yield _paragraph_text(node), images
+                    body.clear()
+
+
+def _make_text_item(i: int, chunk: str) -> dict:
+    # 첫 라인으로 레이블 추출
+    first_line = chunk.splitlines()[0] if chunk else f"paragraph_{i}"
+    return {
+        "id": chunk_id("text", chunk),  # 내용 해시: 파일이 달라도/다시 올려도 같은 문단은 같은 id
+        "type": "text",
+        "label": first_line,
+        "content": chunk,
+    }
+
+
+def _make_image_item(ref: ImageRef, label: str) -> dict:
+    return {
+        "id": chunk_id("image", ref.digest),
+        "type": "image",
+        "label": label or ref.name,
+        "content": ref,  # 바이트 대신 참조만 담아 세션/캐시가 커지지 않게 합니다. (image_utils.image_thumbnail)
+    }
+
+
+def iter_docx_chunks(uploaded_file) -> Iterator[dict]:
+    """
+    빈 문단으로 나뉜 문단 묶음을 완성되는 대로 data_list 항목(dict)으로 내보냅니다.
+    그림 항목은 그 그림이 들어 있던 묶음 바로 뒤에 내보냅니다. (묶음 경계는 그림과 상관없이 같습니다)
+    """
+    index = 0
     current_chunk = []
+    pending_images = []
 
-    for para in document.paragraphs:
-        text = para.text.strip()
+    for text, images in iter_docx_paragraphs(uploaded_file):
+        text = text.strip()
         if not text:
             if current_chunk:
-                chunks.append("\n".join(current_chunk))
+                yield _make_text_item(index, "\n".join(current_chunk))
+                index += 1
                 current_chunk = []
         else:
             current_chunk.append(text)
+        pending_images.extend(images)
+        if not current_chunk:
+            yield from pending_images
+            pending_images = []
 
     if current_chunk:
-        chunks.append("\n".join(current_chunk))
-
-    data_list = []
-    for i, chunk in enumerate(chunks):
-        # 첫 라인으로 레이블 추출
-        first_line = chunk.splitlines()[0] if chunk else f"paragraph_{i}"
-        data_list.append(
-            {
-                "id": f"paragraph_{i}",
-                "type": "text",
-                "label": first_line,
-                "content": chunk,
-            }
-        )
-    return data_list
+        yield _make_text_item(index, "\n".join(current_chunk))
+    yield from pending_images
 
-def find_tables(ws) -> List[Tuple[int,int,int,int]]:
-    max_row = ws.max_row
-    max_col = ws.max_column
 
-    visited = [[False]*(max_col+1) for _ in range(max_row+1)]
-    tables = []
+# ✅ docx 파일 처리 함수 (문단 추출)
+def process_docx_file(uploaded_file):
+    with stage("docx.parse") as s:
+        items = list(iter_docx_chunks(uploaded_file))
+        s["items"] = len(items)
+    return items
 
-    for r in range(1, max_row+1):
-        for c in range(1, max_col+1):
-            if visited[r][c]:
-                continue
-            
-            is_valid_start_point = False
-
-            current_cell_has_value = ws.cell(row=r, column=c).value is not None
-            
-            if r > 1 and ws.cell(row=r-1, column=c).value is not None and not visited[r-1][c]:
-                 continue
-            if c > 1 and ws.cell(row=r, column=c-1).value is not None and not visited[r][c-1]:
-                 continue
-
-            has_right_neighbor_value = (c + 1 <= max_col and ws.cell(row=r, column=c+1).value is not None)
-            has_bottom_neighbor_value = (r + 1 <= max_row and ws.cell(row=r+1, column=c).value is not None)
-
-            if current_cell_has_value or (has_right_neighbor_value and has_bottom_neighbor_value):
-                is_valid_start_point = True
-            
-            if is_valid_start_point:
-                start_row, start_col = r, c
-                end_row, end_col = r, c
-
-                while end_row < max_row and \
-                      any(ws.cell(row=end_row+1, column=col).value is not None and not visited[end_row+1][col] \
-                          for col in range(start_col, end_col+1)):
-                    end_row += 1
-                
-                while end_col < max_col and \
-                      any(ws.cell(row=row, column=end_col+1).value is not None and not visited[row][end_col+1] \
-                          for row in range(start_row, end_row+1)):
-                    end_col += 1
-
-                for rr in range(start_row, end_row+1):
-                    for cc in range(start_col, end_col+1):
-                        visited[rr][cc] = True
-
-                tables.append((start_row, end_row, start_col, end_col))
-    
-    return tables
+def sheet_values(ws) -> Dict[Tuple[int, int], object]:
+    """값이 있는 셀만 (row, col) -> 값 으로 모읍니다. (서식만 있는 빈 셀은 제외)"""
+    # 리더가 만든 값 그리드는 값이 있는 셀만 담고 있습니다.
+    if isinstance(ws, dict):
+        return ws
+
+    # 일반 모드 워크시트는 실제로 생성된 셀만 _cells에 보관하므로
+    # 시트의 외곽 범위(max_row * max_col)를 훑지 않아도 됩니다.
+    cells = getattr(ws, "_cells", None)
+    if cells is not None:
+        return {coord: cell.value for coord, cell in cells.items() if cell.value is not None}
+
+    values = {}
+    for r, row in enumerate(ws.iter_rows(values_only=True), start=1):
+        for c, value in enumerate(row, start=1):
+            if value is not None:
+                values[(r, c)] = value
+    return values
 
 
-def extract_table(ws, start_row, end_row, start_col, end_col) -> pd.DataFrame:
+def _filled_cells(ws) -> Set[Tuple[int, int]]:
+    """값이 있는 셀 좌표만 모읍니다."""
+    return set(sheet_values(ws))
+
+
+class SheetGrid:
     """
-    주어진 영역에서 테이블을 추출하여 DataFrame으로 변환.
-    헤더 없이 모든 행을 데이터로 처리하고, 기본 숫자 헤더를 사용합니다.
+    시트의 값을 사용 범위 크기의 2차원 object 배열에 한 번만 담아 둡니다. (빈 칸은 None)
+    표는 이 배열을 복사하지 않고 잘라 낸 뷰(view)로 다룹니다.
     """
-    data = []
+
+    def __init__(self, values: np.ndarray, first_row: int, first_col: int):
+        self.values = values
+        self.first_row = first_row
+        self.first_col = first_col
+
+    @classmethod
+    def from_cells(cls, cells: Dict[Tuple[int, int], object]) -> Optional["SheetGrid"]:
+        """
+        값 그리드로 배열을 만듭니다. 셀이 드문드문 멀리 떨어져 있어 배열이 지나치게 커지면
+        (SHEET_GRID_MAX_CELLS와 채워진 셀 수의 SHEET_GRID_MAX_SPARSITY배를 모두 넘으면) None을 돌려줍니다.
+        """
+        if not cells:
+            return None
+        coords = np.fromiter((v for coord in cells for v in coord), dtype=np.int64, count=2 * len(cells))
+        rows, cols = coords[0::2], coords[1::2]
+        first_row, first_col = int(rows.min()), int(cols.min())
+        shape = (int(rows.max()) - first_row + 1, int(cols.max()) - first_col + 1)
+        area = shape[0] * shape[1]
+        if area > SHEET_GRID_MAX_CELLS and area > len(cells) * SHEET_GRID_MAX_SPARSITY:
+            return None
+        values = np.full(shape, None, dtype=object)
+        flat = np.empty(len(cells), dtype=object)
+        flat[:] = list(cells.values())
+        values[rows - first_row, cols - first_col] = flat
+        return cls(values, first_row, first_col)
+
+    def region(self, start_row, end_row, start_col, end_col) -> np.ndarray:
+        return self.values[
+            start_row - self.first_row:end_row - self.first_row + 1,
+            start_col - self.first_col:end_col - self.first_col + 1,
+        ]
+
+
+def _region_from_cells(cells, start_row, end_row, start_col, end_col) -> np.ndarray:
+    """SheetGrid를 만들지 않은(너무 드문) 시트에서 영역 하나만 배열로 만듭니다."""
+    block = np.full((end_row - start_row + 1, end_col - start_col + 1), None, dtype=object)
     for r in range(start_row, end_row + 1):
-        row = []
         for c in range(start_col, end_col + 1):
-            row.append(ws.cell(row=r, column=c).value)
-        data.append(row)
+            value = cells.get((r, c))
+            if value is not None:
+                block[r - start_row, c - start_col] = value
+    return block
+
+
+def find_tables(ws) -> List[Tuple[int,int,int,int]]:
+    """
+    값이 있는 셀만 방문하여 테이블 영역 (start_row, end_row, start_col, end_col)을 찾습니다.
+    시간/메모리는 시트의 외곽 범위가 아니라 채워진 셀 개수에 비례합니다.
+    """
+    filled = _filled_cells(ws)
 
-    # 헤더 없이 모든 데이터를 바로 DataFrame으로 만듭니다.
-    # columns=None으로 설정하면 pandas가 기본 숫자 인덱스를 컬럼명으로 사용합니다.
-    df = pd.DataFrame(data)
+    # 시작점 후보: 값이 있는 셀 + 오른쪽과 아래쪽이 모두 채워진 빈 셀
+    candidates = set(filled)
+    for r, c in filled:
+        if c > 1 and (r, c-1) not in filled and (r+1, c-1) in filled:
+            candidates.add((r, c-1))
 
-    return df
+    # 행/열 별 후보 좌표 인덱스 (정렬된 리스트)
+    row_index = defaultdict(list)
+    col_index = defaultdict(list)
+    for r, c in sorted(candidates):
+        row_index[r].append(c)
+    for r, c in sorted(candidates, key=lambda rc: (rc[1], rc[0])):
+        col_index[c].append(r)
 
-def should_split_first_row(row: pd.Series) -> bool:
-    return pd.notna(row.iloc[0]) and row.iloc[1:].isna().all()
+    def span(index, key, lo, hi):
+        values = index.get(key, ())
+        return values[bisect_left(values, lo):bisect_right(values, hi)]
 
-def split_df_on_first_row(df: pd.DataFrame) -> List[pd.DataFrame]:
-    if df.empty or len(df) < 2:
-        return [df]
+    visited = set()
+    tables = []
 
-    first_row = df.iloc[0]
-    if pd.notna(first_row.iloc[0]) and first_row.iloc[1:].isna().all():
-        df1 = pd.DataFrame([[first_row.iloc[0]]])
-        df2 = df.iloc[1:].reset_index(drop=True)
-        return [df1, df2]
-    else:
-        return [df]
+    for r, c in sorted(candidates):
+        if (r, c) in visited:
+            continue
+
+        if (r-1, c) in filled and (r-1, c) not in visited:
+            continue
+        if (r, c-1) in filled and (r, c-1) not in visited:
+            continue
+
+        start_row, start_col = r, c
+        end_row, end_col = r, c
+
+        while any((end_row+1, col) in filled and (end_row+1, col) not in visited
+                  for col in span(row_index, end_row+1, start_col, end_col)):
+            end_row += 1
+
+        while any((row, end_col+1) in filled and (row, end_col+1) not in visited
+                  for row in span(col_index, end_col+1, start_row, end_row)):
+            end_col += 1
+
+        for rr in range(start_row, end_row+1):
+            for cc in span(row_index, rr, start_col, end_col):
+                visited.add((rr, cc))
+
+        tables.append((start_row, end_row, start_col, end_col))
+
+    return tables
+
+
+def extract_blocks(cells, tables) -> List[np.ndarray]:
+    """표 영역마다 값 배열을 잘라 냅니다. 시트 배열(SheetGrid)을 만들 수 있으면 그 뷰를 씁니다."""
+    grid = SheetGrid.from_cells(cells)
+    if grid is not None:
+        return [grid.region(*region) for region in tables]
+    return [_region_from_cells(cells, *region) for region in tables]
+
+
+def split_block_on_first_row(block: np.ndarray) -> List[np.ndarray]:
+    """
+    첫 행이 첫 칸에만 값이 있으면 제목(1x1)과 나머지 행으로 나눕니다. (복사 없이 뷰만 만듭니다)
+    """
+    if block.shape[0] < 2 or block.shape[1] == 0:
+        return [block]
+    first_row = block[0]
+    if first_row[0] is not None and not np.not_equal(first_row[1:], None).any():
+        return [block[:1, :1], block[1:]]
+    return [block]
+
+
+def block_to_dataframe(block: np.ndarray) -> pd.DataFrame:
+    # 리스트로 만든 DataFrame과 같은 열 타입이 되도록 object 열의 타입을 추론합니다.
+    return pd.DataFrame(block, copy=False).infer_objects()
 
-def process_xlsx_file(uploaded_file: BytesIO) -> Dict[str, List[pd.DataFrame]]:
-    wb = load_workbook(uploaded_file, data_only=True)
-    sheet_data = {}
 
-    for sheet_name in wb.sheetnames:
-        ws = wb[sheet_name]
-        tables = find_tables(ws)
-        dfs = []
-        for (start_row, end_row, start_col, end_col) in tables:
-            df = extract_table(ws, start_row, end_row, start_col, end_col)
-            dfs.append(df)
+def process_sheet(ws) -> List[pd.DataFrame]:
+    """
+    시트 하나에서 테이블을 찾아 DataFrame 목록으로 추출합니다.
+    셀 값은 한 번만 읽어 배열(SheetGrid)로 만들고, 표와 제목 행은 그 배열의 뷰로 잘라 냅니다.
+    """
+    cells = sheet_values(ws)
+    with stage("xlsx.find_tables", cells=len(cells)) as s:
+        tables = find_tables(cells)
+        s["tables"] = len(tables)
+
+    with stage("xlsx.extract_table", tables=len(tables)):
+        blocks = extract_blocks(cells, tables)
 
+    # 제목 행을 떼어 낸 뒤 열마다 타입을 정해 작게 저장합니다. (문자열 뷰는 화면에 그릴 때만 만듭니다)
+    with stage("xlsx.to_dataframes", tables=len(blocks)):
         final_dfs = []
-        for df in dfs:
-            final_dfs.extend(split_df_on_first_row(df))
+        for (start_row, end_row, start_col, end_col), block in zip(tables, blocks):
+            parts = split_block_on_first_row(block)
+            if len(parts) == 2:
+                regions = [(start_row, start_row, start_col, start_col), (start_row + 1, end_row, start_col, end_col)]
+            else:
+                regions = [(start_row, end_row, start_col, end_col)]
+            for part, region in zip(parts, regions):
+                df = compact_dtypes(block_to_dataframe(part))
+                # 원래 위치를 남겨 두면 편집/생성한 표를 원본 통합 문서에 다시 쓸 수 있습니다. (export_utils)
+                df.attrs["region"] = region
+                final_dfs.append(df)
+    return final_dfs
+
+def process_xlsx_file(
+    uploaded_file: BytesIO,
+    reader: str = DEFAULT_XLSX_READER,
+    max_workers: Optional[int] = None,
+) -> Dict[str, List[pd.DataFrame]]:
+    """
+    xlsx 파일의 시트별 테이블을 추출합니다.
+    reader로 워크북을 읽는 방식을 고릅니다. (xlsx_readers.XLSX_READERS 참고)
+    max_workers가 2 이상이면 큰 시트(SHEET_PARALLEL_MIN_CELLS 이상)의 테이블 탐지/추출을
+    프로세스 풀에서 최대 max_workers개씩 병렬로 처리합니다. 결과는 항상 시트 순서를 따릅니다.
+    """
+    if max_workers is None:
+        max_workers = default_sheet_workers()
+
+    with stage("xlsx.process_file", reader=reader) as s:
+        sheet_data = _process_xlsx_sheets(uploaded_file, reader, max_workers)
+        s["sheets"] = len(sheet_data)
+        s["tables"] = sum(len(dfs) for dfs in sheet_data.values())
+    return sheet_data
 
+def _process_xlsx_sheets(uploaded_file, reader, max_workers) -> Dict[str, List[pd.DataFrame]]:
+    results = []
+    pool = None
+    in_flight = set()
+    # 워크북 읽기(시트 값 모으기) 시간만 따로 xlsx.read로 기록합니다.
+    for sheet_name, ws in iter_stage("xlsx.read", XLSX_READERS[reader](uploaded_file), reader=reader):
+        if max_workers > 1 and isinstance(ws, dict) and len(ws) >= SHEET_PARALLEL_MIN_CELLS:
+            pool = pool or get_process_pool()
+            # 공유 풀의 크기와 별개로, 이 워크북의 시트는 max_workers개까지만 동시에 보냅니다.
+            # (읽어 둔 시트 값이 풀 대기열에 쌓여 메모리를 차지하지 않도록)
+            if len(in_flight) >= max_workers:
+                _, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            future = submit_recorded(pool, process_sheet, ws)
+            in_flight.add(future)
+            results.append((sheet_name, future))
+        else:
+            results.append((sheet_name, process_sheet(ws)))
+
+    sheet_data = {}
+    for sheet_name, final_dfs in results:
+        if isinstance(final_dfs, Future):
+            final_dfs = unwrap_recorded(final_dfs.result())
         if final_dfs:
+            for df in final_dfs:
+                df.attrs["sheet"] = sheet_name
             sheet_data[sheet_name] = final_dfs
 
-    return sheet_data
\ No newline at end of file
+    return sheet_data
@@ -0,0 +1,190 @@
+import os
+from io import BytesIO
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from table_types import with_header
+
+# 시트 이름 -> {(row, col): 값}. 값이 None이면 그 칸을 비웁니다.
+SheetOverlay = Dict[Tuple[int, int], Any]
+
+
+def export_streaming_min_bytes() -> int:
+    """원본 파일이 이보다 크면 통합 문서 전체를 메모리에 올리지 않는 스트리밍 경로로 씁니다."""
+    return int(os.getenv("EXPORT_STREAMING_MIN_MB", "20")) * 1024 * 1024
+
+
+def _cell_value(value: Any, original: Any = None) -> Any:
+    if value is None or pd.isna(value):
+        return None
+    # 편집용 표는 값을 문자열로 바꿔 두므로, 바뀌지 않은 칸은 원래 값(숫자/날짜 등)을 그대로 씁니다.
+    if isinstance(value, str):
+        if original is None or pd.isna(original):
+            if value in ("", "nan", "None", "<NA>"):
+                return None
+        elif value == str(original):
+            return original
+        elif isinstance(original, (int, float)) and not isinstance(original, bool):
+            # 숫자 칸에 숫자를 입력했으면 숫자로 씁니다.
+            for cast in (int, float):
+                try:
+                    return cast(value)
+                except ValueError:
+                    pass
+    if isinstance(value, pd.Timestamp):
+        return value.to_pydatetime()
+    if hasattr(value, "item"):  # numpy 스칼라
+        return value.item()
+    return value
+
+
+def _same_value(a: Any, b: Any) -> bool:
+    if a is None or b is None:
+        return a is None and b is None
+    try:
+        return bool(a == b)
+    except (TypeError, ValueError):
+        return False
+
+
+def table_overlay(df: pd.DataFrame, region: Tuple[int, int, int, int], original: Optional[pd.DataFrame] = None) -> Tuple[SheetOverlay, List[str]]:
+    """
+    df를 region의 왼쪽 위 칸부터 썼을 때 원본과 달라지는 칸만 모은 셀 변경 목록을 만듭니다.
+    (df의 모든 행이 데이터, 열 이름은 쓰지 않음)
+    바뀌지 않은 칸은 건드리지 않으므로 수식/서식이 그대로 남습니다. (원본 표는 수식의 계산 결과로 읽은 값입니다)
+    df가 원래 영역보다 작으면 남는 칸 중 값이 있던 칸만 비우고, 크면 영역 밖까지 쓰되 경고를 돌려줍니다.
+    """
+    start_row, end_row, start_col, end_col = region
+    values = df.astype(object).values
+    original_values = original.astype(object).values if original is not None else np.empty((0, 0), dtype=object)
+
+    def original_at(i, j):
+        if i < original_values.shape[0] and j < original_values.shape[1]:
+            value = original_values[i, j]
+            return None if value is None or pd.isna(value) else value
+        return None
+
+    overlay = {}
+    n_rows = max(values.shape[0], end_row - start_row + 1)
+    n_cols = max(values.shape[1], end_col - start_col + 1)
+    for i in range(n_rows):
+        for j in range(n_cols):
+            orig = original_at(i, j)
+            if i < values.shape[0] and j < values.shape[1]:
+                value = _cell_value(values[i, j], orig)
+            else:
+                value = None
+            if not _same_value(value, orig):
+                overlay[(start_row + i, start_col + j)] = value
+
+    warnings = []
+    n_rows, n_cols = values.shape
+    if n_rows > end_row - start_row + 1 or n_cols > end_col - start_col + 1:
+        warnings.append(
+            f"표가 원래 영역({end_row - start_row + 1}x{end_col - start_col + 1})보다 커서 "
+            f"영역 밖 칸({n_rows}x{n_cols})까지 덮어씁니다."
+        )
+    return overlay, warnings
+
+
+def collect_overlays(tables: List[Tuple[pd.DataFrame, pd.DataFrame]]) -> Tuple[Dict[str, Dict[str, SheetOverlay]], List[str]]:
+    """
+    (원본 표, 새 표) 목록을 원본 파일별/시트별 셀 변경으로 모읍니다.
+    원본 표의 attrs(source, sheet, region)로 위치를 찾으므로, 위치 정보가 없는 표는 건너뜁니다.
+    """
+    overlays = {}
+    warnings = []
+    for original, new in tables:
+        source, sheet, region = (original.attrs.get(k) for k in ("source", "sheet", "region"))
+        if not (source and sheet and region):
+            warnings.append("원래 위치를 알 수 없는 표는 내보내지 않았습니다.")
+            continue
+        overlay, table_warnings = table_overlay(new, region, with_header(original))
+        if overlay:
+            overlays.setdefault(source, {}).setdefault(sheet, {}).update(overlay)
+        warnings += [f"{source} / {sheet}: {w}" for w in table_warnings]
+    return overlays, warnings
+
+
+def _write_back_inplace(source: bytes, overlays: Dict[str, SheetOverlay]) -> Tuple[bytes, List[str]]:
+    """
+    원본 통합 문서를 열어 값만 바꿉니다. 서식/병합/다른 시트가 그대로 유지됩니다.
+    병합된 영역은 왼쪽 위 칸에만 값을 쓸 수 있어 나머지 칸의 변경은 건너뛰고 경고를 돌려줍니다.
+    """
+    from openpyxl import load_workbook
+    from openpyxl.cell.cell import MergedCell
+
+    wb = load_workbook(BytesIO(source))
+    warnings = []
+    for sheet_name, overlay in overlays.items():
+        ws = wb[sheet_name]
+        skipped = 0
+        for (r, c), value in overlay.items():
+            cell = ws.cell(row=r, column=c)
+            if isinstance(cell, MergedCell):
+                skipped += 1
+                continue
+            cell.value = value
+        if skipped:
+            warnings.append(f"{sheet_name}: 병합된 칸 {skipped}개는 바꾸지 않았습니다.")
+    output = BytesIO()
+    wb.save(output)
+    return output.getvalue(), warnings
+
+
+def _write_back_streaming(source: bytes, overlays: Dict[str, SheetOverlay]) -> Tuple[bytes, List[str]]:
+    """
+    원본을 읽기 전용으로 한 행씩 읽어 쓰기 전용 통합 문서에 옮기면서 값을 바꿉니다.
+    메모리는 행 하나 크기만 쓰지만, 셀 서식과 병합 정보는 옮기지 않습니다.
+    """
+    from openpyxl import Workbook, load_workbook
+
+    src = load_workbook(BytesIO(source), read_only=True)
+    out = Workbook(write_only=True)
+    try:
+        for ws in src.worksheets:
+            overlay = overlays.get(ws.title, {})
+            rows_with_changes = {}
+            for (r, c), value in overlay.items():
+                rows_with_changes.setdefault(r, {})[c] = value
+            target = out.create_sheet(ws.title)
+            last_row = 0
+            for r, row in enumerate(ws.iter_rows(values_only=True), start=1):
+                values = list(row)
+                changes = rows_with_changes.pop(r, None)
+                if changes:
+                    width = max(len(values), max(changes))
+                    values += [None] * (width - len(values))
+                    for c, value in changes.items():
+                        values[c - 1] = value
+                target.append(values)
+                last_row = r
+            # 원본 사용 범위 아래로 늘어난 행
+            for r in sorted(rows_with_changes):
+                for _ in range(r - last_row - 1):
+                    target.append([])
+                changes = rows_with_changes[r]
+                values = [None] * max(changes)
+                for c, value in changes.items():
+                    values[c - 1] = value
+                target.append(values)
+                last_row = r
+    finally:
+        src.close()
+    output = BytesIO()
+    out.save(output)
+    return output.getvalue(), []
+
+
+def write_back(source: bytes, overlays: Dict[str, SheetOverlay], streaming: Optional[bool] = None) -> Tuple[bytes, List[str]]:
+    """
+    원본 xlsx 바이트의 복사본에 시트별 셀 변경을 한 번에 반영한 (xlsx 바이트, 경고 목록)을 돌려줍니다.
+    streaming이 None이면 원본 크기(EXPORT_STREAMING_MIN_MB)로 경로를 고릅니다.
+    """
+    if streaming is None:
+        streaming = len(source) >= export_streaming_min_bytes()
+    if streaming:
+        return _write_back_streaming(source, overlays)
+    return _write_back_inplace(source, overlays)
@@ -0,0 +1,83 @@
+import hashlib
+import os
+from functools import lru_cache
+from io import BytesIO
+from typing import NamedTuple, Optional
+
+from cache_utils import ByteLRUCache
+
+THUMBNAIL_MAX_PX = 512
+
+
+class ImageRef(NamedTuple):
+    """문서에 들어 있던 이미지의 참조. 바이트는 블롭 저장소에 두고 화면에 그릴 때만 꺼냅니다."""
+    digest: str     # 원본 바이트의 sha256 (블롭 저장소 키)
+    name: str       # 패키지 안의 파일 이름 (예: image1.png)
+    size: int       # 원본 바이트 수
+
+
+# ✅ 원본 이미지 바이트 저장소: 파싱 워커 프로세스가 쓴 파일을 화면 프로세스가 디스크에서 읽습니다.
+@lru_cache(maxsize=None)
+def get_blob_store() -> ByteLRUCache:
+    return ByteLRUCache(
+        max_bytes=int(os.getenv("IMAGE_BLOB_CACHE_MB", "64")) * 1024 * 1024,
+        spill_dir=os.getenv("IMAGE_BLOB_DIR", os.path.join(".cache", "blobs")),
+        max_disk_bytes=int(os.getenv("IMAGE_BLOB_DISK_MAX_MB", "2048")) * 1024 * 1024,
+        write_through=True,
+    )
+
+
+# ✅ 축소 이미지 캐시: 한 번 만든 썸네일은 모든 세션이 함께 씁니다. (메모리만 사용)
+@lru_cache(maxsize=None)
+def get_thumbnail_cache() -> ByteLRUCache:
+    return ByteLRUCache(max_bytes=int(os.getenv("THUMBNAIL_CACHE_MB", "32")) * 1024 * 1024)
+
+
+def store_image(name: str, data: bytes) -> ImageRef:
+    """이미지 바이트를 저장소에 (같은 내용은 한 번만) 넣고 참조를 돌려줍니다."""
+    digest = hashlib.sha256(data).hexdigest()
+    store = get_blob_store()
+    if digest not in store:
+        store.set(digest, data)
+    return ImageRef(digest, name, len(data))
+
+
+def load_image(ref: ImageRef) -> Optional[bytes]:
+    return get_blob_store().get(ref.digest)
+
+
+def make_thumbnail(data: bytes, max_px: int = THUMBNAIL_MAX_PX) -> Optional[bytes]:
+    """
+    긴 변이 max_px 이하가 되게 줄인 이미지 바이트. 투명도가 있으면 PNG, 아니면 JPEG로 저장합니다.
+    Pillow가 없거나 읽을 수 없는 형식(EMF/WMF 등)이면 None.
+    """
+    try:
+        from PIL import Image
+    except ImportError:
+        return None
+    try:
+        with Image.open(BytesIO(data)) as img:
+            img.draft("RGB", (max_px, max_px))  # JPEG는 처음부터 줄여서 디코딩합니다.
+            img.thumbnail((max_px, max_px))
+            output = BytesIO()
+            if img.mode in ("RGBA", "LA", "P"):
+                img.save(output, format="PNG", optimize=True)
+            else:
+                img.convert("RGB").save(output, format="JPEG", quality=85)
+            return output.getvalue()
+    except Exception:
+        return None
+
+
+def image_thumbnail(ref: ImageRef, max_px: int = THUMBNAIL_MAX_PX) -> Optional[bytes]:
+    """화면에 그릴 축소 이미지. 처음 요청할 때만 원본을 디코딩하고 이후에는 캐시에서 돌려줍니다."""
+    cache = get_thumbnail_cache()
+    key = f"{ref.digest}:{max_px}"
+    thumbnail = cache.get(key)
+    if thumbnail is None:
+        data = load_image(ref)
+        if data is None:
+            return None
+        thumbnail = make_thumbnail(data, max_px) or b""
+        cache.set(key, thumbnail)
+    return thumbnail or None
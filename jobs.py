@@ -0,0 +1,128 @@
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import List, Optional
+
+import pandas as pd
+
+from llm_utils import cells_to_dataframe, fill_table, fill_table_stream
+from profiling import stage, submit_in_context
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = "queued", "running", "done", "failed", "cancelled"
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_job_executor() -> ThreadPoolExecutor:
+    """
+    서버 프로세스 전체가 공유하는 표 채우기 작업용 스레드 풀.
+    작업은 대부분 모델 응답을 기다리는 시간이라 스레드로 충분합니다. (FILL_JOB_WORKERS, 기본 4)
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=int(os.getenv("FILL_JOB_WORKERS", "4")),
+                thread_name_prefix="fill-job",
+            )
+        return _executor
+
+
+class FillJob:
+    """
+    백그라운드에서 도는 표 채우기 작업 하나.
+    화면(스크립트 스레드)은 status/rows를 읽기만 하고, 값은 작업 스레드만 바꿉니다.
+    """
+
+    def __init__(self, table_key: str, keys: List[str], contents: List[str], stream: bool = True):
+        self.id = uuid.uuid4().hex[:8]
+        self.table_key = table_key
+        self.keys = keys
+        self.columns = list(dict.fromkeys(keys))
+        self.contents = contents
+        self.stream = stream
+        self.status = QUEUED
+        self.rows = []
+        self.result: Optional[pd.DataFrame] = None
+        self.error: Optional[BaseException] = None
+        self.submitted_at = time.time()
+        self.finished_at: Optional[float] = None
+        self._cancel = threading.Event()
+        self._lock = threading.Lock()
+        self._future: Optional[Future] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (DONE, FAILED, CANCELLED)
+
+    @property
+    def elapsed(self) -> float:
+        return (self.finished_at or time.time()) - self.submitted_at
+
+    def partial_table(self) -> pd.DataFrame:
+        """지금까지 받은 행으로 만든 표 (스트리밍 중 미리보기용)"""
+        return cells_to_dataframe(list(self.rows), self.columns)
+
+    def cancel(self):
+        """
+        작업을 바로 취소 상태로 바꿉니다. 실행 중인 스레드는 다음 행을 받을 때 멈추고 결과는 버립니다.
+        (스트리밍하지 않는 요청은 이미 보낸 요청을 끊을 수 없어 응답이 올 때까지 스레드를 씁니다)
+        """
+        self._cancel.set()
+        if self._future is not None:
+            self._future.cancel()
+        self._finish(CANCELLED)
+
+    def _finish(self, status: str, result: Optional[pd.DataFrame] = None) -> bool:
+        # 취소와 완료가 겹치면 먼저 정해진 상태를 유지합니다. 결과는 완료가 이긴 경우에만 남깁니다.
+        with self._lock:
+            if self.finished:
+                return False
+            self.result = result
+            self.finished_at = time.time()
+            self.status = status
+            return True
+
+    def _start(self) -> bool:
+        """대기 중인 작업만 실행 상태로 바꿉니다. 그 사이 취소됐으면 False."""
+        with self._lock:
+            if self.status != QUEUED or self._cancel.is_set():
+                return False
+            self.status = RUNNING
+            return True
+
+    def run(self):
+        if not self._start():
+            self._finish(CANCELLED)
+            return
+        try:
+            with stage("fill.job", columns=len(self.keys), contents=len(self.contents), stream=self.stream) as s:
+                if self.stream:
+                    rows = fill_table_stream(self.keys, self.contents)
+                    try:
+                        for row in rows:
+                            if self._cancel.is_set():
+                                break
+                            self.rows.append(row)
+                    finally:
+                        rows.close()  # 남은 배치 요청을 멈춥니다.
+                    df = self.partial_table()
+                else:
+                    df = fill_table(self.keys, self.contents)
+                s["rows"] = max(len(df) - 1, 0)
+                s["cancelled"] = self._cancel.is_set()
+        except Exception as e:
+            self.error = e
+            self._finish(FAILED)
+            return
+        self._finish(DONE, df)
+
+
+def submit_fill_job(table_key: str, keys: List[str], contents: List[str], stream: bool = True) -> FillJob:
+    """작업을 공유 스레드 풀에 넣고 바로 돌려줍니다. (현재 프로파일 기록기도 함께 넘깁니다)"""
+    job = FillJob(table_key, keys, contents, stream)
+    job._future = submit_in_context(get_job_executor(), job.run)
+    return job
@@ -0,0 +1,432 @@
+import hashlib
+import json
+import os
+import time
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Any, Dict, Iterator, List, Optional
+
+import pandas as pd
+
+from cache_utils import ByteLRUCache
+from profiling import record, stage, submit_in_context
+from rate_limit import get_client_pool
+from table_types import table_header
+
+DEFAULT_MODEL = "gemini-2.5-flash"
+
+
+def create_dynamic_table_cell_model(keys: List[str]):
+    return _table_cell_model(tuple(keys))
+
+
+# pydantic/google-genai는 가져오는 데 오래 걸려 표를 처음 채울 때 가져옵니다.
+@lru_cache(maxsize=128)
+def _table_cell_model(keys: tuple):
+    from pydantic import create_model
+
+    fields = {key: (str, ...) for key in keys}  # 모든 필드를 필수 str 타입으로 설정
+    DynamicTableCell = create_model('DynamicTableCell', **fields)
+    return DynamicTableCell
+
+
+@lru_cache(maxsize=None)
+def get_genai_client():
+    """
+    프로세스 전체가 함께 쓰는 Gemini 클라이언트 (요청마다 새로 만들지 않아 연결을 재사용합니다)
+    GEMINI_BASE_URL을 주면 그 주소로 보냅니다. (benchmarks/fake_gemini_server.py 등 로컬 테스트용)
+    """
+    from google import genai
+
+    base_url = os.getenv("GEMINI_BASE_URL")
+    if base_url:
+        return genai.Client(http_options={"base_url": base_url})
+    return genai.Client()
+
+
+def build_table_prompt(keys: List[str], prompt_text: str) -> str:
+    return (
+        "아래 열 이름들을 가진 표를 채우기 위한 JSON 배열을 만들어 주세요.\n"
+        f"열 이름(키): {keys}\n"
+        "입력 데이터:\n"
+        f"{prompt_text}\n"
+    )
+
+
+def estimate_tokens(text: str) -> int:
+    """토크나이저 없이 쓰는 대략적인 토큰 수 (UTF-8 4바이트당 1토큰, 한글은 글자당 약 0.75토큰)"""
+    return len(text.encode("utf-8")) // 4 + 1
+
+
+def split_into_batches(contents: List[str], max_tokens: int) -> List[List[str]]:
+    """
+    선택된 문단들을 순서대로 묶어 배치당 max_tokens를 넘지 않게 나눕니다.
+    문단 하나가 max_tokens보다 크면 그 문단만 따로 한 배치가 됩니다.
+    """
+    batches = []
+    current = []
+    current_tokens = 0
+    for content in contents:
+        tokens = estimate_tokens(content)
+        if current and current_tokens + tokens > max_tokens:
+            batches.append(current)
+            current = []
+            current_tokens = 0
+        current.append(content)
+        current_tokens += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+
+class IncrementalJsonArrayParser:
+    """
+    스트리밍으로 들어오는 JSON 배열 텍스트에서 완성된 원소만 골라냅니다.
+    feed()에 조각을 넣을 때마다 새로 완성된 원소 목록을 돌려줍니다.
+    """
+
+    def __init__(self):
+        self._decoder = json.JSONDecoder()
+        self._buffer = ""
+        self._started = False
+        self.finished = False
+
+    def feed(self, text: str) -> List[Any]:
+        self._buffer += text
+        items = []
+        pos = 0
+        buffer = self._buffer
+        while not self.finished:
+            while pos < len(buffer) and (buffer[pos].isspace() or (self._started and buffer[pos] == ",")):
+                pos += 1
+            if pos >= len(buffer):
+                break
+            if not self._started:
+                if buffer[pos] != "[":
+                    raise ValueError(f"JSON 배열이 아닙니다: {buffer[pos:pos + 20]!r}")
+                self._started = True
+                pos += 1
+                continue
+            if buffer[pos] == "]":
+                self.finished = True
+                pos += 1
+                break
+            try:
+                item, end = self._decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                break  # 아직 원소가 다 들어오지 않았습니다.
+            # 버퍼 끝에서 끝난 숫자/리터럴은 뒤에 더 이어질 수 있으므로 기다립니다.
+            if end == len(buffer) and buffer[end - 1] not in '}]"':
+                break
+            items.append(item)
+            pos = end
+        self._buffer = buffer[pos:]
+        return items
+
+
+def _usage_tokens(response) -> Optional[int]:
+    usage = getattr(response, "usage_metadata", None)
+    return getattr(usage, "total_token_count", None)
+
+
+class GeminiBackend:
+    """
+    Gemini API로 표 행을 생성합니다.
+    요청은 공유 관문(rate_limit.get_client_pool)을 거쳐 속도 제한, 재시도, 동시성 조절을 받습니다.
+    """
+
+    name = "gemini"
+
+    def __init__(self, client=None, pool=None):
+        self.client = client or get_genai_client()
+        self.pool = pool or get_client_pool()
+
+    def generate_rows(self, model: str, keys: List[str], contents: List[str]) -> List[Dict[str, Any]]:
+        DynamicTableCell = create_dynamic_table_cell_model(keys)
+        prompt = build_table_prompt(keys, "\n".join(contents))
+        response = self.pool.call(
+            lambda: self.client.models.generate_content(
+                model=model,
+                contents=prompt,
+                config={
+                    "response_mime_type": "application/json",
+                    "response_schema": list[DynamicTableCell],
+                },
+            ),
+            tokens=estimate_tokens(prompt),
+            usage=_usage_tokens,
+        )
+        return [cell.model_dump() for cell in (response.parsed or [])]
+
+    def stream_rows(self, model: str, keys: List[str], contents: List[str]) -> Iterator[Dict[str, Any]]:
+        """스트리밍 응답에서 JSON 배열 원소가 완성될 때마다 스키마로 검증한 행을 내보냅니다."""
+        DynamicTableCell = create_dynamic_table_cell_model(keys)
+        prompt = build_table_prompt(keys, "\n".join(contents))
+        parser = IncrementalJsonArrayParser()
+        for chunk in self.pool.stream(
+            lambda: self.client.models.generate_content_stream(
+                model=model,
+                contents=prompt,
+                config={
+                    "response_mime_type": "application/json",
+                    "response_schema": list[DynamicTableCell],
+                },
+            ),
+            tokens=estimate_tokens(prompt),
+        ):
+            for item in parser.feed(chunk.text or ""):
+                yield DynamicTableCell.model_validate(item).model_dump()
+
+
+class FakeBackend:
+    """
+    네트워크 없이 쓰는 대체 백엔드. 입력 문단마다 스키마에 맞는 행을 하나씩 결정적으로 만듭니다.
+    latency_ms를 주면 요청마다 그만큼 기다려 실제 API 응답 시간을 흉내 냅니다. (부하/벤치마크용)
+    """
+
+    name = "fake"
+
+    def __init__(self, latency_ms: Optional[float] = None):
+        if latency_ms is None:
+            latency_ms = float(os.getenv("FAKE_FILL_LATENCY_MS", "0"))
+        self.latency_ms = latency_ms
+
+    def generate_rows(self, model: str, keys: List[str], contents: List[str]) -> List[Dict[str, Any]]:
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        DynamicTableCell = create_dynamic_table_cell_model(keys)
+        rows = []
+        for content in contents:
+            digest = hashlib.sha256(content.encode("utf-8")).hexdigest()[:8]
+            label = content.strip().splitlines()[0][:20] if content.strip() else ""
+            values = {key: f"{label} {key} {digest}".strip() for key in keys}
+            rows.append(DynamicTableCell(**values).model_dump())
+        return rows
+
+    def stream_rows(self, model: str, keys: List[str], contents: List[str]) -> Iterator[Dict[str, Any]]:
+        # 지연 시간을 행 단위로 나눠 스트리밍 응답을 흉내 냅니다.
+        rows = FakeBackend(latency_ms=0).generate_rows(model, keys, contents)
+        for row in rows:
+            if self.latency_ms:
+                time.sleep(self.latency_ms / 1000 / max(len(rows), 1))
+            yield row
+
+
+FILL_BACKENDS = {
+    "gemini": GeminiBackend,
+    "fake": FakeBackend,
+}
+
+
+def get_fill_backend(name: Optional[str] = None):
+    """TABLE_FILL_BACKEND 환경 변수(기본 gemini)로 표 채우기 백엔드를 고릅니다."""
+    name = name or os.getenv("TABLE_FILL_BACKEND", "gemini")
+    return FILL_BACKENDS[name]()
+
+
+# ✅ 모델 응답 캐시: 같은 (백엔드, 모델, 열 이름, 입력 배치)는 다시 요청하지 않습니다.
+@lru_cache(maxsize=None)
+def get_response_cache() -> ByteLRUCache:
+    return ByteLRUCache(
+        max_bytes=int(os.getenv("LLM_CACHE_MAX_MB", "64")) * 1024 * 1024,
+        spill_dir=os.getenv("LLM_CACHE_DIR", os.path.join(".cache", "llm")),
+        max_disk_bytes=int(os.getenv("LLM_CACHE_DISK_MAX_MB", "512")) * 1024 * 1024,
+        write_through=True,
+    )
+
+
+def response_cache_key(backend_name: str, model: str, keys: List[str], contents: List[str]) -> str:
+    content_hash = hashlib.sha256("\x00".join(contents).encode("utf-8")).hexdigest()
+    return f"{backend_name}:{model}:{json.dumps(keys, ensure_ascii=False)}:{content_hash}"
+
+
+def generate_table_rows(
+    backend, model: str, keys: List[str], contents: List[str], cache: Optional[ByteLRUCache] = None
+) -> List[Dict[str, Any]]:
+    """contents로 표 한 번 채우기 요청을 보내고 행(dict) 목록을 돌려줍니다. cache가 있으면 먼저 찾아봅니다."""
+    with stage("llm.generate", backend=backend.name, prompt_tokens=sum(map(estimate_tokens, contents))) as s:
+        rows = None
+        if cache is not None:
+            key = response_cache_key(backend.name, model, keys, contents)
+            rows = cache.get(key)
+        s["cached"] = rows is not None
+        if rows is None:
+            rows = backend.generate_rows(model, keys, contents)
+            if cache is not None:
+                cache.set(key, rows)
+        s["rows"] = len(rows)
+        s["response_chars"] = len(json.dumps(rows, ensure_ascii=False, default=str))
+    return rows
+
+
+def stream_table_rows(
+    backend, model: str, keys: List[str], contents: List[str], cache: Optional[ByteLRUCache] = None
+) -> Iterator[Dict[str, Any]]:
+    """generate_table_rows의 스트리밍 버전. 다 받은 결과는 캐시에 저장합니다."""
+    key = response_cache_key(backend.name, model, keys, contents)
+    rows = cache.get(key) if cache is not None else None
+    if rows is not None:
+        record("llm.stream", 0.0, backend=backend.name, rows=len(rows), cached=True)
+        yield from rows
+        return
+
+    # 스트리밍 구간은 소비하는 쪽 시간이 섞이므로 stage() 대신 첫 행 지연과 전체 시간을 직접 기록합니다.
+    start = time.perf_counter()
+    first_row_seconds = None
+    rows = []
+    for row in backend.stream_rows(model, keys, contents):
+        if first_row_seconds is None:
+            first_row_seconds = time.perf_counter() - start
+        rows.append(row)
+        yield row
+    record(
+        "llm.stream",
+        time.perf_counter() - start,
+        backend=backend.name,
+        prompt_tokens=sum(map(estimate_tokens, contents)),
+        rows=len(rows),
+        first_row_seconds=first_row_seconds,
+        response_chars=len(json.dumps(rows, ensure_ascii=False, default=str)),
+        cached=False,
+    )
+    if cache is not None:
+        cache.set(key, rows)
+
+
+def _row_fingerprint(row: Dict[str, Any]) -> tuple:
+    return tuple((k, str(v).strip()) for k, v in row.items())
+
+
+def merge_rows(row_batches: List[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """배치별 결과를 순서대로 합치고, 앞뒤 공백만 다른 중복 행은 한 번만 남깁니다."""
+    merged = []
+    seen = set()
+    for rows in row_batches:
+        for row in rows:
+            fingerprint = _row_fingerprint(row)
+            if fingerprint in seen:
+                continue
+            seen.add(fingerprint)
+            merged.append(row)
+    return merged
+
+
+def table_keys(df: pd.DataFrame) -> List[str]:
+    """표의 첫 행(머리글)을 채울 열 이름(스키마 필드)으로 씁니다."""
+    # pandas 버전에 따라 astype(str)이 결측값을 문자열로 바꾸지 않으므로 str()로 변환합니다.
+    return [str(value) for value in table_header(df)]
+
+
+def cells_to_dataframe(rows: List[Dict[str, Any]], keys: Optional[List[str]] = None) -> pd.DataFrame:
+    # key들을 첫 행으로 넣고, values들을 그 아래 행으로 붙이기
+    if keys is None:
+        keys = list(rows[0].keys())  # 첫 번째 dict의 key 목록
+    data = [keys] + [[row.get(key) for key in keys] for row in rows]
+
+    # DataFrame 생성 (header 없이 숫자 인덱스 열 이름 사용)
+    return pd.DataFrame(data)
+
+
+def _fill_settings(keys, backend, batch_tokens, max_concurrency, use_cache):
+    batch_tokens = batch_tokens or int(os.getenv("FILL_BATCH_TOKENS", "8000"))
+    max_concurrency = max_concurrency or int(os.getenv("FILL_MAX_CONCURRENCY", "4"))
+    backend = backend or get_fill_backend()
+    cache = get_response_cache() if use_cache else None
+    keys = list(dict.fromkeys(keys))  # 중복 열 이름은 스키마 필드 하나로 합쳐집니다.
+    return keys, backend, batch_tokens, max_concurrency, cache
+
+
+def fill_table(
+    keys: List[str],
+    contents: List[str],
+    backend=None,
+    model: str = DEFAULT_MODEL,
+    batch_tokens: Optional[int] = None,
+    max_concurrency: Optional[int] = None,
+    use_cache: bool = True,
+) -> pd.DataFrame:
+    """
+    keys 열을 가진 표를 contents로 채웁니다.
+    입력이 batch_tokens보다 크면 배치로 나눠 동시에 요청(map)하고, 결과 행을 합쳐 중복을 제거(reduce)합니다.
+    배치별 응답은 캐시되므로 입력 일부만 바뀌어도 바뀐 배치만 다시 요청합니다.
+    """
+    keys, backend, batch_tokens, max_concurrency, cache = _fill_settings(
+        keys, backend, batch_tokens, max_concurrency, use_cache
+    )
+    contents = list(dict.fromkeys(contents))  # 같은 문단은 프롬프트에 한 번만 넣습니다.
+
+    batches = split_into_batches(contents, batch_tokens)
+    if not batches:
+        return cells_to_dataframe([], keys)  # 입력이 없으면 머리글만 있는 표
+    if len(batches) == 1:
+        row_batches = [generate_table_rows(backend, model, keys, batches[0], cache)]
+    else:
+        with ThreadPoolExecutor(max_workers=min(max_concurrency, len(batches))) as executor:
+            futures = [
+                submit_in_context(executor, generate_table_rows, backend, model, keys, batch, cache)
+                for batch in batches
+            ]
+            row_batches = [future.result() for future in futures]
+
+    return cells_to_dataframe(merge_rows(row_batches), keys)
+
+
+_DONE = object()
+
+
+def fill_table_stream(
+    keys: List[str],
+    contents: List[str],
+    backend=None,
+    model: str = DEFAULT_MODEL,
+    batch_tokens: Optional[int] = None,
+    max_concurrency: Optional[int] = None,
+    use_cache: bool = True,
+) -> Iterator[Dict[str, Any]]:
+    """
+    fill_table의 스트리밍 버전. 배치들을 동시에 스트리밍하면서 행이 완성되는 대로 (중복 없이) 내보냅니다.
+    행의 순서는 도착 순서입니다. 배치 순서로 정렬된 최종 표가 필요하면 fill_table을 쓰세요.
+    """
+    keys, backend, batch_tokens, max_concurrency, cache = _fill_settings(
+        keys, backend, batch_tokens, max_concurrency, use_cache
+    )
+    contents = list(dict.fromkeys(contents))  # 같은 문단은 프롬프트에 한 번만 넣습니다.
+    batches = split_into_batches(contents, batch_tokens)
+    if not batches:
+        return
+
+    results = queue.Queue()
+    stop = threading.Event()
+
+    def run(batch):
+        try:
+            for row in stream_table_rows(backend, model, keys, batch, cache):
+                if stop.is_set():
+                    return
+                results.put(row)
+        except Exception as e:
+            results.put(e)
+        finally:
+            results.put(_DONE)
+
+    seen = set()
+    with ThreadPoolExecutor(max_workers=min(max_concurrency, len(batches))) as executor:
+        for batch in batches:
+            submit_in_context(executor, run, batch)
+        try:
+            remaining = len(batches)
+            while remaining:
+                item = results.get()
+                if item is _DONE:
+                    remaining -= 1
+                    continue
+                if isinstance(item, Exception):
+                    raise item
+                fingerprint = _row_fingerprint(item)
+                if fingerprint not in seen:
+                    seen.add(fingerprint)
+                    yield item
+        finally:
+            stop.set()
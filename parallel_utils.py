@@ -0,0 +1,114 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
+from typing import Any, Callable, Iterator, List, NamedTuple, Optional, Tuple
+
+from cache_utils import content_digest, get_parse_cache, parse_cache_key
+from profiling import submit_recorded, unwrap_recorded
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def default_worker_count() -> int:
+    return int(os.getenv("INGEST_WORKERS", "0")) or os.cpu_count() or 1
+
+
+def get_process_pool(max_workers: Optional[int] = None) -> ProcessPoolExecutor:
+    """
+    서버 프로세스 전체가 공유하는 프로세스 풀. max_workers는 풀을 처음 만들 때만 적용됩니다.
+    Streamlit은 스레드에서 스크립트를 돌리므로 fork 대신 spawn으로 워커를 띄웁니다.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=max_workers or default_worker_count(),
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _pool
+
+
+def _reset_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def _parse_bytes(parser: Callable, data: bytes) -> Any:
+    return parser(BytesIO(data))
+
+
+class IngestResult(NamedTuple):
+    index: int          # 업로드 순서
+    name: str
+    result: Any         # 실패하면 None
+    error: Optional[BaseException]
+
+
+def ingest_files(
+    parser: Callable,
+    files: List[Tuple[str, bytes]],
+    version: str,
+    max_workers: Optional[int] = None,
+) -> Iterator[IngestResult]:
+    """
+    (파일 이름, 바이트) 목록을 프로세스 풀에서 병렬로 파싱하고, 끝나는 순서대로 결과를 내보냅니다.
+    - 파싱 캐시에 있는 파일은 바로 돌려주고, 나머지만 풀에 보냅니다.
+    - 호출한 쪽은 IngestResult.index로 업로드 순서대로 다시 합칠 수 있습니다.
+    - 작업이 하나뿐이거나 max_workers가 1이면 현재 프로세스에서 바로 처리합니다.
+    """
+    cache = get_parse_cache()
+    max_workers = max_workers or default_worker_count()
+
+    pending = []
+    for index, (name, data) in enumerate(files):
+        key = parse_cache_key(parser, version, content_digest(data))
+        cached = cache.get(key)
+        if cached is not None:
+            yield IngestResult(index, name, cached, None)
+        else:
+            pending.append((index, name, data, key))
+
+    if len(pending) <= 1 or max_workers <= 1:
+        for index, name, data, key in pending:
+            try:
+                result = parser(BytesIO(data))
+            except Exception as e:
+                yield IngestResult(index, name, None, e)
+                continue
+            cache.set(key, result)
+            yield IngestResult(index, name, result, None)
+        return
+
+    # 같은 배치 안의 동일한 파일은 한 번만 파싱합니다.
+    by_key = {}
+    for index, name, data, key in pending:
+        by_key.setdefault(key, (data, []))[1].append((index, name))
+
+    pool = get_process_pool(max_workers)
+    futures = {
+        submit_recorded(pool, _parse_bytes, parser, data): (key, targets)
+        for key, (data, targets) in by_key.items()
+    }
+    for future in as_completed(futures):
+        key, targets = futures[future]
+        error = future.exception()
+        if isinstance(error, BrokenProcessPool):
+            _reset_pool()
+        result = None
+        if error is None:
+            # 워커에서 기록한 파싱 단계는 현재 프로파일 기록기로 합칩니다.
+            result = unwrap_recorded(future.result())
+            cache.set(key, result)
+        for index, name in targets:
+            if error is not None:
+                yield IngestResult(index, name, None, error)
+            else:
+                # 같은 결과 객체를 여러 항목에서 공유하지 않도록 캐시에서 새로 꺼냅니다.
+                yield IngestResult(index, name, cache.get(key) or result, None)
@@ -0,0 +1,230 @@
+import contextvars
+import json
+import threading
+import time
+import tracemalloc
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional
+from weakref import WeakSet
+
+# 현재 스크립트 실행(rerun)의 기록기. 없으면 stage()/record()는 아무것도 하지 않습니다.
+_current_recorder: contextvars.ContextVar = contextvars.ContextVar("profile_recorder", default=None)
+# 중첩된 stage의 메모리 계산용 스택 (스레드별)
+_frames = threading.local()
+
+# 메모리 측정을 켠 기록기들. 하나라도 있으면 tracemalloc을 켜 두고, 모두 끄면 직접 켠 tracemalloc만 끕니다.
+_tracing_recorders: WeakSet = WeakSet()
+_tracing_lock = threading.Lock()
+_tracemalloc_started = False
+
+
+def _update_tracing(recorder: "ProfileRecorder", enabled: bool):
+    global _tracemalloc_started
+    with _tracing_lock:
+        if enabled:
+            _tracing_recorders.add(recorder)
+        else:
+            _tracing_recorders.discard(recorder)
+        if len(_tracing_recorders):
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                _tracemalloc_started = True
+        elif _tracemalloc_started:
+            # 켜 두면 모든 할당이 느려지므로, 측정하는 세션이 하나도 없을 때만 끕니다.
+            tracemalloc.stop()
+            _tracemalloc_started = False
+
+
+class ProfileRecorder:
+    """
+    단계별 측정 기록(실행 시간, 최대 메모리, 항목 수)을 최근 max_records개까지 보관합니다.
+    track_memory가 True면 tracemalloc으로 단계별 최대 할당량도 잽니다. (실행이 느려지므로 디버그용)
+    tracemalloc은 프로세스 전체를 재므로 여러 세션이 동시에 돌면 메모리 값은 근사치입니다.
+    """
+
+    def __init__(self, max_records: int = 5000, track_memory: bool = False):
+        self.records = deque(maxlen=max_records)
+        self.run_id = 0
+        self._lock = threading.Lock()
+        self._track_memory = False
+        self.track_memory = track_memory
+
+    @property
+    def track_memory(self) -> bool:
+        return self._track_memory
+
+    @track_memory.setter
+    def track_memory(self, enabled: bool):
+        """메모리 측정을 켜고 끕니다. tracemalloc은 켠 기록기가 하나라도 있는 동안 켜져 있습니다."""
+        self._track_memory = bool(enabled)
+        _update_tracing(self, self._track_memory)
+
+    def new_run(self) -> int:
+        self.run_id += 1
+        return self.run_id
+
+    def add(self, stage: str, seconds: float, peak_mb: Optional[float] = None, **counts):
+        record = {
+            "run": self.run_id,
+            "stage": stage,
+            "ts": time.time(),
+            "seconds": seconds,
+            "peak_mb": peak_mb,
+            **counts,
+        }
+        with self._lock:
+            self.records.append(record)
+
+    def extend(self, records: Iterable[dict]):
+        """다른 프로세스(풀 워커)에서 받은 기록을 현재 실행의 기록으로 더합니다."""
+        with self._lock:
+            for r in records:
+                self.records.append({**r, "run": self.run_id})
+
+    def clear(self):
+        with self._lock:
+            self.records.clear()
+
+    def to_jsonl(self) -> str:
+        with self._lock:
+            records = list(self.records)
+        return "".join(json.dumps(r, ensure_ascii=False, default=str) + "\n" for r in records)
+
+
+def activate(recorder: Optional[ProfileRecorder]):
+    """
+    현재 실행 컨텍스트(Streamlit 스크립트 스레드)의 기록기를 지정합니다. None이면 이 컨텍스트의 기록만 끕니다.
+    (tracemalloc은 기록기의 track_memory로 켜고 끕니다)
+    """
+    _current_recorder.set(recorder)
+    if recorder is not None:
+        recorder.new_run()
+
+
+def current_recorder() -> Optional[ProfileRecorder]:
+    return _current_recorder.get()
+
+
+def record(stage_name: str, seconds: float, **counts):
+    """stage()로 감쌀 수 없는 구간(스트리밍 등)을 직접 기록합니다."""
+    recorder = _current_recorder.get()
+    if recorder is not None:
+        recorder.add(stage_name, seconds, **counts)
+
+
+def _frame_stack() -> List[dict]:
+    stack = getattr(_frames, "stack", None)
+    if stack is None:
+        stack = _frames.stack = []
+    return stack
+
+
+@contextmanager
+def stage(stage_name: str, **counts) -> Iterator[Dict[str, Any]]:
+    """
+    with stage("xlsx.find_tables", cells=n) as s:
+        ...
+        s["tables"] = len(tables)   # 끝난 뒤 알게 된 항목 수는 이렇게 더합니다.
+    """
+    recorder = _current_recorder.get()
+    if recorder is None:
+        yield counts
+        return
+
+    frame = None
+    if recorder.track_memory and tracemalloc.is_tracing():
+        stack = _frame_stack()
+        current, peak = tracemalloc.get_traced_memory()
+        if stack:
+            # 안쪽 단계가 peak를 초기화하기 전에 바깥 단계의 최대값을 넘겨 둡니다.
+            stack[-1]["max"] = max(stack[-1]["max"], peak)
+        tracemalloc.reset_peak()
+        frame = {"base": current, "max": current}
+        stack.append(frame)
+
+    start = time.perf_counter()
+    try:
+        yield counts
+    finally:
+        seconds = time.perf_counter() - start
+        peak_mb = None
+        if frame is not None:
+            stack = _frame_stack()
+            for i in range(len(stack) - 1, -1, -1):
+                if stack[i] is frame:
+                    del stack[i]
+                    break
+            if tracemalloc.is_tracing():
+                frame["max"] = max(frame["max"], tracemalloc.get_traced_memory()[1])
+                if stack:
+                    stack[-1]["max"] = max(stack[-1]["max"], frame["max"])
+                peak_mb = (frame["max"] - frame["base"]) / (1024 * 1024)
+        recorder.add(stage_name, seconds, peak_mb, **counts)
+
+
+def submit_in_context(executor, fn, *args):
+    """현재 기록기가 스레드 풀 작업에도 전달되도록 컨텍스트를 복사해 제출합니다."""
+    return executor.submit(contextvars.copy_context().run, fn, *args)
+
+
+def iter_stage(stage_name: str, iterable: Iterable, **counts) -> Iterator:
+    """
+    iterable에서 항목을 꺼내는 데 걸린 시간만 모아 끝날 때 한 번 기록합니다.
+    (시트를 하나씩 읽는 리더처럼, 소비하는 쪽 처리 시간이 섞이면 안 되는 반복에 씁니다)
+    """
+    recorder = _current_recorder.get()
+    if recorder is None:
+        yield from iterable
+        return
+    seconds = 0.0
+    items = 0
+    iterator = iter(iterable)
+    while True:
+        start = time.perf_counter()
+        try:
+            item = next(iterator)
+        except StopIteration:
+            seconds += time.perf_counter() - start
+            break
+        seconds += time.perf_counter() - start
+        items += 1
+        yield item
+    recorder.add(stage_name, seconds, items=items, **counts)
+
+
+class RecordedResult(NamedTuple):
+    """풀 워커의 결과와 그 워커에서 쌓인 단계 기록"""
+    result: Any
+    records: List[dict]
+
+
+def _run_recorded(track_memory: bool, fn: Callable, *args) -> RecordedResult:
+    recorder = ProfileRecorder(track_memory=track_memory)
+    token = _current_recorder.set(recorder)
+    try:
+        result = fn(*args)
+    finally:
+        _current_recorder.reset(token)
+        recorder.track_memory = False
+    return RecordedResult(result, list(recorder.records))
+
+
+def submit_recorded(executor, fn: Callable, *args):
+    """
+    프로세스 풀에 fn을 보냅니다. 현재 기록기가 있으면 워커에서도 단계를 기록해 결과와 함께 돌려받습니다.
+    결과는 unwrap_recorded()로 꺼내야 기록이 현재 기록기로 합쳐집니다.
+    """
+    recorder = _current_recorder.get()
+    if recorder is None:
+        return executor.submit(fn, *args)
+    return executor.submit(_run_recorded, recorder.track_memory, fn, *args)
+
+
+def unwrap_recorded(value: Any) -> Any:
+    if not isinstance(value, RecordedResult):
+        return value
+    recorder = _current_recorder.get()
+    if recorder is not None:
+        recorder.extend(value.records)
+    return value.result
@@ -0,0 +1,238 @@
+import os
+import random
+import threading
+import time
+from collections import deque
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterator, Optional
+
+from profiling import record
+
+RETRYABLE_STATUS = (408, 429, 500, 502, 503, 504)
+
+
+def error_status(error: BaseException) -> Optional[int]:
+    """google-genai(APIError.code)나 httpx 응답 오류에서 HTTP 상태 코드를 꺼냅니다."""
+    code = getattr(error, "code", None)
+    if isinstance(code, int):
+        return code
+    response = getattr(error, "response", None)
+    return getattr(response, "status_code", None)
+
+
+def is_rate_limited(error: BaseException) -> bool:
+    return error_status(error) == 429
+
+
+def is_transient_error(error: BaseException) -> bool:
+    """다시 보내면 성공할 수 있는 오류 (429/5xx, 연결 끊김, 시간 초과)"""
+    if error_status(error) in RETRYABLE_STATUS:
+        return True
+    if isinstance(error, (ConnectionError, TimeoutError)):
+        return True
+    try:
+        import httpx
+    except ImportError:
+        return False
+    return isinstance(error, httpx.TransportError)
+
+
+class RateLimiter:
+    """
+    최근 60초 동안의 요청 수(rpm)와 토큰 수(tpm)를 프로세스 전체에서 제한합니다. 0이면 제한하지 않습니다.
+    acquire()는 한도 안에 들어갈 때까지 기다린 뒤 사용량을 기록합니다.
+    """
+
+    window = 60.0
+
+    def __init__(self, rpm: int = 0, tpm: int = 0):
+        self.rpm = rpm
+        self.tpm = tpm
+        self._events = deque()  # [시각, 토큰 수]
+        self._tokens = 0
+        self._lock = threading.Lock()
+
+    def _expire(self, now: float):
+        while self._events and now - self._events[0][0] >= self.window:
+            self._tokens -= self._events.popleft()[1]
+
+    def _wait_seconds(self, tokens: int, now: float) -> float:
+        """지금 보내면 한도를 넘는 경우, 넘지 않게 될 때까지 남은 시간"""
+        wait = 0.0
+        if self.rpm and len(self._events) >= self.rpm:
+            wait = self._events[len(self._events) - self.rpm][0] + self.window - now
+        if self.tpm and self._events and self._tokens + tokens > self.tpm:
+            # 오래된 요청부터 빠질 때 들어갈 자리가 생기는 시점 (한 요청이 tpm보다 크면 창이 빌 때까지)
+            freed = self._tokens + tokens - self.tpm
+            for ts, used in self._events:
+                freed -= used
+                if freed <= 0:
+                    break
+            wait = max(wait, ts + self.window - now)
+        return wait
+
+    def acquire(self, tokens: int = 0) -> list:
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._expire(now)
+                wait = self._wait_seconds(tokens, now)
+                if wait <= 0:
+                    event = [now, tokens]
+                    self._events.append(event)
+                    self._tokens += tokens
+                    break
+            time.sleep(min(wait, 1.0))
+            waited += min(wait, 1.0)
+        if waited:
+            record("llm.rate_limit_wait", waited, tokens=tokens)
+        return event
+
+    def settle(self, event: list, tokens: int):
+        """응답의 실제 토큰 수를 알게 되면 예상치를 고칩니다."""
+        with self._lock:
+            if self._events and event is not None and self._events[0][0] <= event[0]:
+                self._tokens += tokens - event[1]
+            event[1] = tokens
+
+
+class AdaptiveConcurrency:
+    """
+    동시 요청 수 상한을 AIMD로 조절합니다.
+    성공이 상한만큼 이어지면 1 늘리고, 429를 받으면 절반으로, 다른 일시적 오류면 1 줄입니다.
+    """
+
+    def __init__(self, initial: int, minimum: int = 1, maximum: int = 32):
+        self.minimum = minimum
+        self.maximum = max(maximum, minimum)
+        self.limit = min(max(initial, minimum), self.maximum)
+        self.active = 0
+        self._successes = 0
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        with self._cond:
+            while self.active >= self.limit:
+                self._cond.wait()
+            self.active += 1
+
+    def release(self, error: Optional[BaseException] = None):
+        with self._cond:
+            self.active -= 1
+            if error is None:
+                self._successes += 1
+                if self._successes >= self.limit:
+                    self._successes = 0
+                    self.limit = min(self.limit + 1, self.maximum)
+            elif is_rate_limited(error):
+                self._successes = 0
+                self.limit = max(self.limit // 2, self.minimum)
+            elif is_transient_error(error):
+                self._successes = 0
+                self.limit = max(self.limit - 1, self.minimum)
+            self._cond.notify_all()
+
+
+class ModelClientPool:
+    """
+    모델 요청을 보내는 공통 관문. 모든 세션의 요청이 같은 속도 제한과 동시성 상한을 거치고,
+    일시적 오류는 지수 백오프(full jitter)로 다시 보냅니다.
+    """
+
+    def __init__(
+        self,
+        rpm: int = 0,
+        tpm: int = 0,
+        max_concurrency: int = 8,
+        max_retries: int = 5,
+        base_delay: float = 0.5,
+        max_delay: float = 30.0,
+    ):
+        self.limiter = RateLimiter(rpm, tpm)
+        self.concurrency = AdaptiveConcurrency(max(1, max_concurrency // 2), maximum=max_concurrency)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.requests = 0
+        self.retries = 0
+        self.failures = 0
+
+    def backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def _retry_or_raise(self, error: BaseException, attempt: int):
+        if not is_transient_error(error) or attempt >= self.max_retries:
+            self.failures += 1
+            raise error
+        self.retries += 1
+        delay = self.backoff(attempt)
+        record("llm.retry", delay, attempt=attempt + 1, status=error_status(error), error=type(error).__name__)
+        time.sleep(delay)
+
+    def call(self, fn: Callable[[], Any], tokens: int = 0, usage: Optional[Callable[[Any], Optional[int]]] = None) -> Any:
+        """fn()을 한도 안에서 호출합니다. usage(결과)가 실제 토큰 수를 돌려주면 tpm 사용량을 고칩니다."""
+        attempt = 0
+        while True:
+            event = self.limiter.acquire(tokens)
+            self.concurrency.acquire()
+            self.requests += 1
+            try:
+                result = fn()
+            except Exception as e:
+                self.concurrency.release(e)
+                self._retry_or_raise(e, attempt)
+                attempt += 1
+                continue
+            self.concurrency.release()
+            actual = usage(result) if usage is not None else None
+            if actual:
+                self.limiter.settle(event, actual)
+            return result
+
+    def stream(self, open_stream: Callable[[], Iterator[Any]], tokens: int = 0) -> Iterator[Any]:
+        """
+        스트리밍 요청. 첫 조각을 받기 전의 오류만 다시 보냅니다. (이미 내보낸 조각을 되돌릴 수 없으므로)
+        스트림이 끝날 때까지 동시성 자리를 차지합니다.
+        """
+        attempt = 0
+        while True:
+            self.limiter.acquire(tokens)
+            self.concurrency.acquire()
+            self.requests += 1
+            started = False
+            error = None
+            try:
+                for chunk in open_stream():
+                    started = True
+                    yield chunk
+                return
+            except Exception as e:
+                error = e
+                if started:
+                    self.failures += 1
+                    raise
+            finally:
+                self.concurrency.release(error)
+            self._retry_or_raise(error, attempt)
+            attempt += 1
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "concurrency_limit": self.concurrency.limit,
+            "active": self.concurrency.active,
+            "requests": self.requests,
+            "retries": self.retries,
+            "failures": self.failures,
+        }
+
+
+@lru_cache(maxsize=None)
+def get_client_pool() -> ModelClientPool:
+    """서버 프로세스 전체가 공유하는 요청 관문 (LLM_RPM, LLM_TPM, LLM_MAX_CONCURRENCY, LLM_MAX_RETRIES)"""
+    return ModelClientPool(
+        rpm=int(os.getenv("LLM_RPM", "0")),
+        tpm=int(os.getenv("LLM_TPM", "0")),
+        max_concurrency=int(os.getenv("LLM_MAX_CONCURRENCY", "8")),
+        max_retries=int(os.getenv("LLM_MAX_RETRIES", "5")),
+    )
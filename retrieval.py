@@ -0,0 +1,122 @@
+import math
+import re
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Tuple
+
+from llm_utils import estimate_tokens
+
+_WORD_RE = re.compile(r"\w+")
+_HANGUL_RE = re.compile(r"[가-힣]")
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    단어 단위 토큰에 더해, 한글 단어는 글자 2-gram도 추가합니다.
+    (조사가 붙은 '계약기간은' 같은 단어도 '계약기간'과 겹치도록)
+    """
+    tokens = []
+    for word in _WORD_RE.findall(text.lower()):
+        tokens.append(word)
+        if len(word) > 2 and _HANGUL_RE.search(word):
+            tokens.extend(word[i:i + 2] for i in range(len(word) - 1))
+    return tokens
+
+
+class BM25Index:
+    """
+    data_list 텍스트 항목에 대한 로컬 BM25 역색인. 네트워크를 쓰지 않으며 항목을 점진적으로 추가할 수 있습니다.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, Dict[str, int]] = defaultdict(dict)
+        self._doc_len: Dict[str, int] = {}
+        self._doc_tokens: Dict[str, int] = {}  # 예상 프롬프트 토큰 수
+        self._doc_terms: Dict[str, Tuple[str, ...]] = {}  # 항목을 뺄 때 지울 역색인 칸
+        self._total_len = 0
+
+    def __len__(self) -> int:
+        return len(self._doc_len)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._doc_len
+
+    def add(self, doc_id: str, text: str):
+        if doc_id in self._doc_len:
+            return
+        counts = Counter(tokenize(text))
+        for term, tf in counts.items():
+            self._postings[term][doc_id] = tf
+        length = sum(counts.values())
+        self._doc_terms[doc_id] = tuple(counts)
+        self._doc_len[doc_id] = length
+        self._doc_tokens[doc_id] = estimate_tokens(text)
+        self._total_len += length
+
+    def add_items(self, data_list: Iterable[dict]):
+        for item in data_list:
+            if item.get("type") == "text":
+                self.add(item["id"], item["content"])
+
+    def remove(self, doc_id: str):
+        if doc_id not in self._doc_len:
+            return
+        for term in self._doc_terms.pop(doc_id):
+            postings = self._postings[term]
+            del postings[doc_id]
+            if not postings:
+                del self._postings[term]
+        self._total_len -= self._doc_len.pop(doc_id)
+        del self._doc_tokens[doc_id]
+
+    def retain(self, doc_ids: Iterable[str]):
+        """doc_ids에 없는 항목을 뺍니다. (남은 항목은 다시 토큰화하지 않습니다)"""
+        keep = set(doc_ids)
+        for doc_id in [doc_id for doc_id in self._doc_len if doc_id not in keep]:
+            self.remove(doc_id)
+
+    def search(self, query: str, k: int = 20) -> List[Tuple[str, float]]:
+        if not self._doc_len:
+            return []
+        n_docs = len(self._doc_len)
+        avgdl = self._total_len / n_docs or 1.0
+        scores = defaultdict(float)
+        for term in set(tokenize(query)):
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc_id, tf in postings.items():
+                norm = tf + self.k1 * (1 - self.b + self.b * self._doc_len[doc_id] / avgdl)
+                scores[doc_id] += idf * tf * (self.k1 + 1) / norm
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+
+    def select(self, query: str, k: int = 20, token_budget: int = 4000) -> List[str]:
+        """점수 순 상위 k개 중 token_budget 안에 들어가는 항목 id를 돌려줍니다."""
+        selected = []
+        used = 0
+        for doc_id, _ in self.search(query, k):
+            tokens = self._doc_tokens[doc_id]
+            if used + tokens > token_budget:
+                continue
+            selected.append(doc_id)
+            used += tokens
+        return selected
+
+
+def auto_select_items(
+    data_list: List[dict],
+    index: BM25Index,
+    query: str,
+    selected_ids: Iterable[str] = (),
+    k: int = 20,
+    token_budget: int = 4000,
+) -> Tuple[List[dict], int]:
+    """
+    직접 고른 항목(selected_ids)에 query와 관련도가 높은 항목을 더해 data_list 순서대로 돌려줍니다.
+    (항목 목록, 자동으로 고른 항목 수)
+    """
+    auto_ids = set(index.select(query, k=k, token_budget=token_budget))
+    keep = auto_ids.union(selected_ids)
+    return [item for item in data_list if item["id"] in keep], len(auto_ids)
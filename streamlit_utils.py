@@ -1,19 +1,24 @@
 from collections import defaultdict
-from dotenv import load_dotenv
 
 import streamlit as st
 import pandas as pd
-from io import BytesIO
-import os
-
-from pydantic import create_model
-from google import genai
+import time
 
 from data_utils import process_docx_file
 from data_utils import process_xlsx_file
-
-load_dotenv()
-print("GOOGLE_API_KEY:", os.getenv("GOOGLE_API_KEY"))  # 환경 변수 값 출력 확인
+from data_utils import PARSER_VERSION
+from parallel_utils import ingest_files
+from llm_utils import table_keys
+from jobs import DONE, FAILED, submit_fill_job
+from table_edits import EditHistory, editor_delta_to_ops, prepare_editable_table
+from retrieval import BM25Index, auto_select_items
+from chunk_store import ChunkStore, unique_items
+from image_utils import image_thumbnail
+from table_catalog import TableCatalog
+from table_types import table_shape, to_display_frame
+from profiling import ProfileRecorder, activate, current_recorder, stage
+from config import get_settings
+from export_utils import collect_overlays, write_back
 
 def render_upload_section():
     """파일 업로더와 업로드 처리 버튼 UI 및 로직을 렌더링합니다."""
@@ -29,16 +34,31 @@ def render_upload_section():
         if uploaded_files:
             # 기존 data_list를 새 업로드 파일로 덮어씁니다.
             st.session_state.data_list = []
-            
+            st.session_state.chunk_store = ChunkStore()
+            st.session_state.table_view_cache = {}
+            # 검색 색인은 세션 동안 유지합니다. 항목 id가 내용 해시라서 이전 업로드에 있던 문단은 다시 색인하지 않습니다.
+            retrieval_index = st.session_state.setdefault("retrieval_index", BM25Index())
+
             # uploaded_files는 accept_multiple_files=True 덕분에 항상 리스트입니다.
-            for f in uploaded_files:
-                try:
-                    # process_docx_file은 BytesIO 객체를 받도록 구현되어야 합니다.
-                    extracted = process_docx_file(BytesIO(f.getvalue()))
-                    st.session_state.data_list.extend(extracted)
-                    st.success(f"'{f.name}' 처리 완료")
-                except Exception as e:
-                    st.error(f"'{f.name}' 처리 중 오류 발생: {e}")
+            # 파일들은 프로세스 풀에서 병렬로 처리되고, 끝나는 대로 상태를 표시합니다.
+            results = {}
+            files = [(f.name, f.getvalue()) for f in uploaded_files]
+            with stage("docx.upload", files=len(files), bytes=sum(len(data) for _, data in files)):
+                for item in ingest_files(process_docx_file, files, PARSER_VERSION):
+                    if item.error is None:
+                        results[item.index] = item.result
+                        retrieval_index.add_items(item.result)  # 파일마다 처리가 끝나는 대로 새 항목만 색인합니다.
+                        st.success(f"'{item.name}' 처리 완료")
+                    else:
+                        st.error(f"'{item.name}' 처리 중 오류 발생: {item.error}")
+
+            # 업로드 순서대로 저장소에 넣습니다. 여러 파일에 반복되는 문단은 항목 하나로 합쳐집니다.
+            store = st.session_state.chunk_store
+            for index in sorted(results):
+                name = files[index][0]
+                store.add_file(f"{index}:{name}", results[index], name=name)
+            st.session_state.data_list = store.items()
+            retrieval_index.retain(item["id"] for item in st.session_state.data_list)  # 이번 업로드에 없는 항목은 뺍니다.
 
             st.session_state.files_processed = True
             st.success(f"✅ 총 {len(uploaded_files)}개의 파일이 성공적으로 처리되었습니다.")
@@ -65,26 +85,78 @@ def render_upload_section():
     #     except Exception as e:
     #         st.error(f"❌ 예시 파일 처리 중 오류 발생: {e}")
 
+DATA_LIST_PAGE_SIZE = 50
+
+def get_selected_ids() -> set:
+    """선택된 data_list 항목 id 집합 (항목마다 세션 키를 두지 않습니다)"""
+    return st.session_state.setdefault("selected_ids", set())
+
+def get_selected_items(data_list):
+    selected_ids = get_selected_ids()
+    return [data for data in data_list if data["id"] in selected_ids]
+
+def _toggle_selection(item_id):
+    if st.session_state.get(f"checkbox_{item_id}", False):
+        get_selected_ids().add(item_id)
+    else:
+        get_selected_ids().discard(item_id)
+
+def _item_sources(item_id):
+    store = st.session_state.get("chunk_store")
+    return store.sources(item_id) if store is not None else []
+
+def _table_view(data):
+    """표 항목의 표시용 DataFrame은 한 번만 만들어 재사용합니다."""
+    views = st.session_state.setdefault("table_view_cache", {})
+    if data["id"] not in views:
+        df = pd.DataFrame(data["content"][1:], columns=data["content"][0])
+        for col in df.columns:
+            df[col] = df[col].astype(str)
+        views[data["id"]] = df
+    return views[data["id"]]
+
+def _show_image(data, caption=None):
+    """이미지 항목은 참조만 갖고 있으므로, 화면에 그릴 때 캐시된 축소 이미지를 꺼냅니다."""
+    thumbnail = image_thumbnail(data["content"])
+    if thumbnail is not None:
+        st.image(thumbnail, caption=caption)
+    else:
+        st.caption(f"🖼️ 미리보기를 만들 수 없는 이미지입니다: {data['content'].name}")
+
 def render_data_list(data_list):
-    with st.container(height=768): # <-- 이제 이 컨테이너가 전체 리스트를 담는 하나의 스크롤 영역이 됩니다.
-        for i, data in enumerate(data_list):
+    # 현재 페이지의 항목만 그려서, 문서가 커져도 rerun 비용이 일정하게 유지됩니다.
+    n_pages = max(1, -(-len(data_list) // DATA_LIST_PAGE_SIZE))
+    selected_ids = get_selected_ids()
+    p_col1, p_col2 = st.columns([1, 2])
+    with p_col1:
+        page = st.number_input("페이지", min_value=1, max_value=n_pages, value=1, step=1, key="data_list_page")
+    with p_col2:
+        st.caption(f"총 {len(data_list)}개 항목 · {n_pages}페이지 · {len(selected_ids)}개 선택됨")
+
+    start = (min(page, n_pages) - 1) * DATA_LIST_PAGE_SIZE
+    page_items = data_list[start:start + DATA_LIST_PAGE_SIZE]
+    with stage("ui.render_data_list", items=len(page_items)), st.container(height=768): # <-- 이제 이 컨테이너가 현재 페이지를 담는 하나의 스크롤 영역이 됩니다.
+        for data in page_items:
             st.checkbox(
                 f"{data['label']} 선택",
                 key=f"checkbox_{data['id']}",
-                value=st.session_state.get(f"checkbox_{data['id']}", False),
+                value=data["id"] in selected_ids,
+                on_change=_toggle_selection,
+                args=(data["id"],),
             )
 
+            sources = _item_sources(data["id"])
+            if len(sources) > 1:
+                st.caption(f"📎 {len(sources)}개 파일에 같은 내용: {', '.join(sources)}")
+
             if data["type"] == "text":
                 st.text(
                     data["content"] # st.text는 value 매개변수 대신 직접 문자열을 받습니다.
                 )
             elif data["type"] == "table":
-                df = pd.DataFrame(data["content"][1:], columns=data["content"][0])
-                for col in df.columns:
-                    df[col] = df[col].astype(str)
-                st.table(df)
+                st.table(_table_view(data))
             elif data["type"] == "image":
-                st.image(data["content"])
+                _show_image(data)
 
             st.divider()
 
@@ -96,14 +168,7 @@ def render_selected_data_section():
     if st.button("✅ **선택된 데이터만 보기**", key="show_selected_data_button"):
 
         with st.container(height=256):
-            selected_data_to_display = []
-            # session_state에 data_list가 있고 비어있지 않은지 확인
-            if "data_list" in st.session_state and st.session_state.data_list:
-                for data_item in st.session_state.data_list:
-                    checkbox_key = f"checkbox_{data_item['id']}"
-                    # 해당 체크박스가 선택되었는지 확인 (기본값 False)
-                    if st.session_state.get(checkbox_key, False):
-                        selected_data_to_display.append(data_item)
+            selected_data_to_display = get_selected_items(st.session_state.get("data_list", []))
 
             if selected_data_to_display:
                 for i, selected_item in enumerate(selected_data_to_display):
@@ -112,15 +177,14 @@ def render_selected_data_section():
                             selected_item["content"]
                         )
                     elif selected_item['type'] == 'table':
-                        df_selected = pd.DataFrame(selected_item["content"][1:], columns=selected_item["content"][0])
                         st.dataframe(
-                            df_selected,
+                            _table_view(selected_item),
                             use_container_width=True,
                             height=150,
                             key=f"selected_view_table_{selected_item['id']}" # 고유 키
                         )
                     elif selected_item['type'] == 'image':
-                        st.image(selected_item['content'], caption=selected_item.get('label', '선택된 이미지'))
+                        _show_image(selected_item, caption=selected_item.get('label', '선택된 이미지'))
                     st.markdown("---") # 각 항목 사이에 구분선
             else:
                 st.info("선택된 데이터가 없습니다.")
@@ -144,69 +208,137 @@ def handle_uploaded_xlsx_files():
         st.session_state.xlsx_files_processed = False
         return
 
+    results = {}
+    files = [(f.name, f.getvalue()) for f in uploaded_files]
+    with stage("xlsx.upload", files=len(files), bytes=sum(len(data) for _, data in files)):
+        for item in ingest_files(process_xlsx_file, files, PARSER_VERSION):
+            if item.error is None:
+                results[item.index] = item.result
+                st.success(f"'{item.name}' 처리 완료")
+            else:
+                st.error(f"'{item.name}' 처리 중 오류 발생: {item.error}")
+
     sheet_data = defaultdict(list)
-    for f in uploaded_files:
-        try:
-            extracted = process_xlsx_file(BytesIO(f.getvalue()))
-            for sheet_name, df_list in extracted.items():
-                sheet_data[sheet_name].extend(df_list)
-            st.success(f"'{f.name}' 처리 완료")
-        except Exception as e:
-            st.error(f"'{f.name}' 처리 중 오류 발생: {e}")
+    for index in sorted(results):
+        for sheet_name, df_list in results[index].items():
+            for df in df_list:
+                df.attrs["source"] = files[index][0]  # 내보내기 때 원본 파일을 찾습니다.
+            sheet_data[sheet_name].extend(df_list)
+
+    # 편집한 표를 다시 써 넣을 원본 파일 (압축된 xlsx 바이트만 보관합니다)
+    st.session_state.xlsx_sources = {files[index][0]: files[index][1] for index in results}
+    st.session_state.export_files = {}
 
     st.session_state.table_data_dict = dict(sheet_data)
+    with stage("xlsx.catalog", tables=sum(len(dfs) for dfs in sheet_data.values())):
+        st.session_state.table_catalog = TableCatalog.from_tables(st.session_state.table_data_dict)
+    st.session_state.xlsx_view_cache = {}
+    # 표 번호("{시트}_{표 번호}")가 가리키는 표가 바뀌므로 이전 결과와 편집 내용은 버립니다.
+    # 이전 파일의 표를 채우던 작업도 취소합니다. (끝난 뒤 새 파일의 같은 번호 표에 들어가지 않도록)
+    for job in st.session_state.get("fill_jobs", {}).values():
+        job.cancel()
+    st.session_state.fill_jobs = {}
+    st.session_state.generated_tables = {}
+    st.session_state.edited_table_data = {}
+    st.session_state.edit_origins = {}
+    st.session_state.edit_histories = {}
+    st.session_state.table_editor_versions = {}
     st.session_state.xlsx_files_processed = True
     st.success(f"✅ 총 {len(uploaded_files)}개의 파일이 성공적으로 처리되었습니다.")
 
+def get_table_catalog() -> TableCatalog:
+    """업로드 처리 때 만든 표 목록. (없으면 지금 table_data_dict로 한 번 만듭니다)"""
+    catalog = st.session_state.get("table_catalog")
+    if catalog is None:
+        catalog = st.session_state.table_catalog = TableCatalog.from_tables(st.session_state.table_data_dict)
+    return catalog
+
 def render_xlsx_table_selector():
-    all_table_info = []
-    global_idx = 0
-    for sheet_name, dfs in st.session_state.table_data_dict.items():
-        table_counter = 1
-        for local_idx, df in enumerate(dfs):
-            if df.shape != (1, 1):
-                label = f"{sheet_name} - 테이블 {table_counter}"
-                all_table_info.append((global_idx, sheet_name, local_idx, label))
-                table_counter += 1
-                global_idx += 1
+    catalog = get_table_catalog()
+    if not len(catalog):
+        st.info("선택할 수 있는 테이블이 없습니다.")
+        return
 
-    selected_label = st.radio(
+    f_col1, f_col2, f_col3 = st.columns([2, 1, 1])
+    with f_col1:
+        query = st.text_input("🔎 표 검색 (시트 이름, 머리글)", key="table_search")
+    with f_col2:
+        sheet = st.selectbox("시트", ["전체"] + catalog.sheets(), key="table_sheet_filter")
+    with f_col3:
+        min_rows = st.number_input("최소 행 수", min_value=0, value=0, step=1, key="table_min_rows")
+
+    entries = catalog.filter(sheet=None if sheet == "전체" else sheet, query=query, min_rows=min_rows)
+    st.caption(f"테이블 {len(entries)}개 / 전체 {len(catalog)}개")
+    if not entries:
+        st.info("조건에 맞는 테이블이 없습니다.")
+        return
+
+    # 수천 개의 표도 라디오 목록 대신 선택 상자 하나로 보여 줍니다.
+    options = [entry.key for entry in entries]
+    option_set = set(options)
+    selected = st.session_state.get("current_selected_table")
+    current_key = f"{selected['sheet_name']}_{selected['table_index']}" if selected else None
+    if st.session_state.get("table_select") not in option_set:
+        st.session_state["table_select"] = current_key if current_key in option_set else options[0]
+    key = st.selectbox(
         "선택할 테이블을 하나 고르세요",
-        [label for _, _, _, label in all_table_info],
-        index=0,
-        key="radio_all_tables"
+        options,
+        format_func=lambda k: catalog.get(k).display,
+        key="table_select",
     )
-    selected_entry = next(e for e in all_table_info if e[3] == selected_label)
-    _, sheet_name, local_idx, _ = selected_entry
+    entry = catalog.get(key)
+    duplicates = catalog.duplicates(entry)
+    if duplicates:
+        st.caption(f"📎 같은 내용의 표: {', '.join(e.label for e in duplicates[:5])}")
 
     st.session_state['current_selected_table'] = {
-        "sheet_name": sheet_name,
-        "table_index": local_idx
+        "sheet_name": entry.sheet,
+        "table_index": entry.index
     }
 
+def _xlsx_table_view(sheet_name, idx):
+    """
+    시트 표의 표시용 DataFrame을 한 번만 만들어 재사용합니다.
+    table_data_dict의 원본 표는 건드리지 않습니다. (업로드 처리 시 캐시를 비웁니다)
+    """
+    views = st.session_state.setdefault("xlsx_view_cache", {})
+    if (sheet_name, idx) not in views:
+        views[(sheet_name, idx)] = to_display_frame(st.session_state.table_data_dict[sheet_name][idx])
+    return views[(sheet_name, idx)]
+
 def render_selected_xlsx_tables():
-    tabs = st.tabs(list(st.session_state.table_data_dict.keys()))
+    # st.tabs는 보이지 않는 탭까지 모두 그리므로, 선택한 시트 하나만 그립니다.
+    sheet_names = list(st.session_state.table_data_dict.keys())
     selected = st.session_state.get('current_selected_table', {})
+    if st.session_state.get("xlsx_active_sheet") not in sheet_names:
+        st.session_state["xlsx_active_sheet"] = selected.get("sheet_name", sheet_names[0]) if sheet_names else None
+    sheet_name = st.radio("시트", sheet_names, horizontal=True, key="xlsx_active_sheet",
+                          label_visibility="collapsed")
+    if sheet_name is None:
+        return
 
-    for tab, sheet_name in zip(tabs, st.session_state.table_data_dict.keys()):
-        with tab:
-            dfs = st.session_state.table_data_dict[sheet_name]
-            with st.container(height=512):
-                text_counter = 1
-                table_counter = 1
-                for idx, df in enumerate(dfs):
-                    if df.shape == (1, 1):
-                        st.text(f"📌 텍스트 {text_counter}: {df.iloc[0, 0]}")
-                        text_counter += 1
-                    else:
-                        st.divider()
-                        label = f"테이블 {table_counter}"
-                        is_selected = (sheet_name == selected.get("sheet_name") and idx == selected.get("table_index"))
-                        st.text(f"{'✅ ' if is_selected else ''}📊 {label}{' (선택됨)' if is_selected else ''}")
-                        for col in df.select_dtypes(include='object').columns:
-                            df[col] = df[col].astype(str)
-                        st.dataframe(df, use_container_width=True)
-                        table_counter += 1
+    dfs = st.session_state.table_data_dict[sheet_name]
+    with stage("ui.render_xlsx_tables", sheet=sheet_name, items=len(dfs)), st.container(height=512):
+        text_counter = 1
+        table_counter = 1
+        for idx, df in enumerate(dfs):
+            if table_shape(df) == (1, 1):
+                st.text(f"📌 텍스트 {text_counter}: {df.iloc[0, 0]}")
+                text_counter += 1
+            else:
+                st.divider()
+                label = f"테이블 {table_counter}"
+                is_selected = (sheet_name == selected.get("sheet_name") and idx == selected.get("table_index"))
+                st.text(f"{'✅ ' if is_selected else ''}📊 {label}{' (선택됨)' if is_selected else ''}")
+                view = _xlsx_table_view(sheet_name, idx)
+                # 큰 표는 앞부분만 보여 주고, 요청할 때만 전체를 그립니다.
+                preview_rows = get_settings().xlsx_preview_rows
+                if len(view) > preview_rows and not st.toggle(
+                    f"전체 {len(view)}행 보기", key=f"xlsx_expand_{sheet_name}_{idx}"
+                ):
+                    view = view.head(preview_rows)
+                st.dataframe(view, use_container_width=True)
+                table_counter += 1
 
 def render_table_editor():
     selection = st.session_state.get('current_selected_table')
@@ -228,37 +360,63 @@ def render_table_editor():
         return None, None, None
 
     key = f"{sheet_name}_{table_index}"
-    df_to_edit = st.session_state.edited_table_data.get(key, dfs[table_index]).copy()
-
-    for col in df_to_edit.select_dtypes(include='object').columns:
-        df_to_edit[col] = df_to_edit[col].astype(str)
-
-    edited_df = st.data_editor(
-        df_to_edit,
+    if key not in st.session_state.edited_table_data:
+        # 작업용 표는 처음 한 번만 만들고, 이후에는 변경분(delta)만 제자리에서 반영합니다.
+        st.session_state.edited_table_data[key] = prepare_editable_table(dfs[table_index])
+        st.session_state.setdefault("edit_origins", {})[key] = _table_origin(dfs[table_index])
+    edited_df = st.session_state.edited_table_data[key]
+
+    editor_key = f"editor_{key}_{_editor_version(key)}"
+    st.data_editor(
+        edited_df,
         use_container_width=True,
-        key=f"editor_{key}",
+        key=editor_key,
         num_rows="dynamic",
+        on_change=_apply_editor_changes,
+        args=(key, editor_key),
     )
 
-    for col in edited_df.select_dtypes(include='object').columns:
-        edited_df[col] = edited_df[col].astype(str)
-
-    prev_df = st.session_state.edited_table_data.get(key)
-
-    if prev_df is None or not edited_df.equals(prev_df):
-        st.session_state.edited_table_data[key] = edited_df
-        st.rerun()
-
     return sheet_name, table_index, edited_df
 
+def _table_origin(df):
+    """표가 원본 파일의 어디에서 왔는지 (파일 이름, 시트, 영역)"""
+    return tuple(df.attrs.get(k) for k in ("source", "sheet", "region"))
+
+def _editor_version(key):
+    return st.session_state.setdefault("table_editor_versions", {}).get(key, 0)
+
+def _edit_history(key) -> EditHistory:
+    histories = st.session_state.setdefault("edit_histories", {})
+    if key not in histories:
+        histories[key] = EditHistory()
+    return histories[key]
+
+def _apply_table_ops(key, ops):
+    """편집 연산을 작업용 표에 적용하고 되돌리기 기록에 남깁니다."""
+    df = st.session_state.edited_table_data[key]
+    st.session_state.edited_table_data[key] = _edit_history(key).apply(df, ops)
+    _reset_editor(key)
+
+def _reset_editor(key):
+    # 표 자체가 바뀌었으므로 data_editor의 변경 상태를 비우기 위해 새 위젯 키를 씁니다.
+    versions = st.session_state.setdefault("table_editor_versions", {})
+    versions[key] = versions.get(key, 0) + 1
+
+def _apply_editor_changes(key, editor_key):
+    """data_editor의 on_change 콜백: 변경된 셀/행만 작업용 표에 반영합니다. (추가 rerun 없음)"""
+    delta = st.session_state.get(editor_key) or {}
+    ops = editor_delta_to_ops(st.session_state.edited_table_data[key], delta)
+    if ops:
+        _apply_table_ops(key, ops)
+
 def render_table_edit_buttons(sheet_name, table_index, edited_df):
     key = f"{sheet_name}_{table_index}"
-    m_col1, m_col2, m_col3 = st.columns([1, 1, 1])
+    history = _edit_history(key)
+    m_col1, m_col2, m_col3, m_col4, m_col5 = st.columns([1, 1, 1, 1, 1])
 
     with m_col1:
         if st.button("➕ 열 추가", key=f"add_col_{key}"):
-            edited_df[f"{len(edited_df.columns)}"] = None
-            st.session_state.edited_table_data[key] = edited_df
+            _apply_table_ops(key, [("add_col", f"{len(edited_df.columns)}", len(edited_df.columns), None)])
             st.success("새 열이 추가되었습니다.")
             st.rerun()
 
@@ -266,8 +424,7 @@ def render_table_edit_buttons(sheet_name, table_index, edited_df):
         if st.button("➖ 열 삭제", key=f"del_col_{key}"):
             if len(edited_df.columns) > 0:
                 col_to_drop = edited_df.columns[-1]
-                edited_df = edited_df.drop(columns=[col_to_drop])
-                st.session_state.edited_table_data[key] = edited_df
+                _apply_table_ops(key, [("drop_col", col_to_drop)])
                 st.success(f"열 '{col_to_drop}' 이(가) 삭제되었습니다.")
                 st.rerun()
             else:
@@ -275,25 +432,36 @@ def render_table_edit_buttons(sheet_name, table_index, edited_df):
 
     with m_col3:
         if st.button("↔️ 전치", key=f"transpose_{key}"):
-            edited_df = edited_df.transpose()
-            edited_df.reset_index(drop=True, inplace=True)
-            st.session_state.edited_table_data[key] = edited_df
+            n_rows, n_cols = edited_df.shape
+            _apply_table_ops(key, [("transpose", list(range(n_cols)), [str(i) for i in range(n_rows)])])
             st.success("테이블이 전치되었습니다.")
             st.rerun()
 
-def handle_table_submission():
-    if st.button("🧮 표 채우기", key="submission"):
-        selected_data_to_print = []
+    with m_col4:
+        if st.button("↩️ 실행 취소", key=f"undo_{key}", disabled=not history.can_undo):
+            st.session_state.edited_table_data[key] = history.undo(edited_df)
+            _reset_editor(key)
+            st.rerun()
 
-        if st.session_state.get("data_list"):
-            for data_item in st.session_state.data_list:
-                checkbox_key = f"checkbox_{data_item['id']}"
-                if st.session_state.get(checkbox_key, False):
-                    selected_data_to_print.append(data_item.get("content", ""))
+    with m_col5:
+        if st.button("↪️ 다시 실행", key=f"redo_{key}", disabled=not history.can_redo):
+            st.session_state.edited_table_data[key] = history.redo(edited_df)
+            _reset_editor(key)
+            st.rerun()
 
-        if not selected_data_to_print:
-            st.warning("선택된 데이터가 없습니다.")
-            return
+def get_retrieval_index(data_list) -> BM25Index:
+    """업로드 때 만든 색인을 쓰고, 없거나 빠진 항목이 있으면 그 항목만 추가합니다."""
+    index = st.session_state.setdefault("retrieval_index", BM25Index())
+    index.add_items(data_list)
+    return index
+
+def handle_table_submission():
+    st.toggle("실시간으로 행 표시", value=True, key="stream_generation")
+    st.toggle("🔎 관련 문단 자동 선택", value=False, key="auto_select_paragraphs",
+              help="표의 열 이름으로 문단을 검색해 관련도가 높은 문단만 모델에 보냅니다.")
+    if st.button("🧮 표 채우기", key="submission"):
+        data_list = st.session_state.get("data_list", [])
+        selected_items = get_selected_items(data_list)
 
         selection = st.session_state.get("current_selected_table")
         if not selection:
@@ -309,68 +477,215 @@ def handle_table_submission():
             st.warning("수정 중인 테이블 데이터를 찾을 수 없습니다.")
             return
 
-        keys = list(edited_df.iloc[0].astype(str))
-        # DynamicTableCell = create_dynamic_table_cell_model(keys)
-
-        def create_dynamic_table_cell_model(keys: list[str]):
-            fields = {key: (str, ...) for key in keys}  # 모든 필드를 필수 str 타입으로 설정
-            DynamicTableCell = create_model('DynamicTableCell', **fields)
-            return DynamicTableCell
-        
-        DynamicTableCell = create_dynamic_table_cell_model(keys)
-
-        print(DynamicTableCell.schema_json(indent=2, ensure_ascii=False))  # 스키마 출력
-
-        client = genai.Client()
-
-        prompt_text = "\n".join(selected_data_to_print)
-
-        response = client.models.generate_content(
-            model="gemini-2.5-flash",
-            contents=(
-                "아래 열 이름들을 가진 표를 채우기 위한 JSON 배열을 만들어 주세요.\n"
-                f"열 이름(키): {keys}\n"
-                "입력 데이터:\n"
-                f"{prompt_text}\n"
-            ),
-            config={
-                "response_mime_type": "application/json",
-                "response_schema": list[DynamicTableCell],
-            },
-        )
+        keys = table_keys(edited_df)
+
+        if st.session_state.get("auto_select_paragraphs", False):
+            # 열 이름과 관련도가 높은 문단을 토큰 예산 안에서 자동으로 더합니다.
+            selected_items, n_auto = auto_select_items(
+                data_list,
+                get_retrieval_index(data_list),
+                " ".join(keys),
+                selected_ids=[item["id"] for item in selected_items],
+                k=get_settings().retrieval_top_k,
+                token_budget=get_settings().retrieval_token_budget,
+            )
+            st.caption(f"🔎 관련 문단 {n_auto}개를 자동으로 선택했습니다.")
 
-        cells = response.parsed
+        # 같은 내용의 항목은 한 번만 보냅니다. (이미지는 모델 입력에서 제외)
+        selected_data_to_print = [
+            item.get("content", "") for item in unique_items(selected_items) if item["type"] != "image"
+        ]
+        if not selected_data_to_print:
+            st.warning("선택된 데이터가 없습니다.")
+            return
 
-        print(cells)
+        jobs = st.session_state.fill_jobs
+        if key in jobs and not jobs[key].finished:
+            st.warning("이 표를 채우는 작업이 이미 진행 중입니다.")
+            return
 
-        def cells_to_dataframe(cells):
-            # 각 인스턴스를 dict로 변환
-            dict_list = [cell.dict() for cell in cells]
+        # 모델 호출은 백그라운드 작업으로 보내고 화면은 바로 돌려줍니다. 결과는 render_generated_table이 받아 옵니다.
+        stream = st.session_state.get("stream_generation", True)
+        jobs[key] = submit_fill_job(key, keys, selected_data_to_print, stream=stream)
+
+def show_generated_table(df, in_progress=False):
+    st.subheader("생성 중인 표" if in_progress else "생성된 표")
+    if in_progress:
+        st.caption(f"{len(df) - 1}개 행 생성됨…")
+    st.dataframe(df, use_container_width=True)
+
+FILL_JOB_POLL_SECONDS = 0.5
+
+def _collect_finished_jobs():
+    """끝난 작업의 결과를 generated_tables로 옮기고, 실패/취소는 한 번 알린 뒤 목록에서 뺍니다."""
+    jobs = st.session_state.fill_jobs
+    generated_tables = st.session_state.generated_tables
+    for key, job in list(jobs.items()):
+        if not job.finished:
+            continue
+        del jobs[key]
+        if job.status == DONE:
+            generated_tables[key] = job.result
+            st.success(f"'{key}' 표를 채웠습니다. ({job.elapsed:.1f}초)")
+        elif job.status == FAILED:
+            st.error(f"'{key}' 표 채우기 중 오류 발생: {job.error}")
+        else:
+            st.info(f"'{key}' 표 채우기를 취소했습니다.")
+
+@st.fragment(run_every=FILL_JOB_POLL_SECONDS)
+def _render_fill_jobs(table_key):
+    jobs = st.session_state.get("fill_jobs", {})
+    if any(job.finished for job in jobs.values()):
+        st.rerun()  # 결과를 세션에 옮기고 화면 전체를 다시 그립니다.
+
+    job = jobs.get(table_key)
+    if job is not None:
+        st.button("⏹️ 취소", key=f"cancel_job_{job.id}", on_click=job.cancel)
+        if job.stream:
+            show_generated_table(job.partial_table(), in_progress=True)
+        else:
+            st.caption(f"⏳ 표를 채우는 중… ({job.elapsed:.0f}초)")
 
-            # key들을 첫 행으로 넣고, values들을 그 아래 행으로 붙이기
-            keys = list(dict_list[0].keys())  # 첫 번째 dict의 key 목록
-            rows = [list(d.values()) for d in dict_list]
+    others = [f"{key} ({len(other.rows)}행)" for key, other in jobs.items() if key != table_key]
+    if others:
+        st.caption("⏳ 다른 표 작업 진행 중: " + ", ".join(others))
 
-            # 전체 데이터 구성: 첫 줄은 keys, 그 아래는 실제 데이터
-            data = [keys] + rows
+def render_generated_table():
+    _collect_finished_jobs()
 
-            # DataFrame 생성 (header 없이 숫자 인덱스 열 이름 사용)
-            df = pd.DataFrame(data)
+    selection = st.session_state.get("current_selected_table")
+    table_key = f"{selection['sheet_name']}_{selection['table_index']}" if selection else None
+    # 지금 선택한 표의 결과만 generated_table로 보여 주고 내보냅니다.
+    df = st.session_state.generated_tables.get(table_key)
+    st.session_state["generated_table"] = df
 
-            return df
-        
-        df = cells_to_dataframe(cells)
-        print(df)
+    if st.session_state.fill_jobs:
+        _render_fill_jobs(table_key)
+    if df is not None:
+        show_generated_table(df)
+    elif table_key not in st.session_state.fill_jobs:
+        st.info("아직 생성된 표가 없습니다.")
+
+XLSX_MIME = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+def _export_tables(use_generated):
+    """
+    (원본 표, 내보낼 표) 목록: 실제로 편집한 표 + (선택 시) 현재 표 자리에 생성된 표
+    편집기는 열어 보기만 한 표도 edited_table_data에 넣으므로 편집 기록이 있는 표만 고르고,
+    편집을 시작한 원본과 지금 그 자리의 표가 다르면 (다른 파일을 처리한 뒤라면) 건너뜁니다.
+    """
+    tables = {}
+    histories = st.session_state.get("edit_histories", {})
+    origins = st.session_state.get("edit_origins", {})
+    for key, edited_df in st.session_state.get("edited_table_data", {}).items():
+        history = histories.get(key)
+        if history is None or not (history.can_undo or history.can_redo):
+            continue
+        sheet_name, _, table_index = key.rpartition("_")
+        dfs = st.session_state.table_data_dict.get(sheet_name, [])
+        if table_index.isdigit() and int(table_index) < len(dfs):
+            original = dfs[int(table_index)]
+            if origins.get(key) == _table_origin(original):
+                tables[key] = (original, edited_df)
+
+    selection = st.session_state.get("current_selected_table")
+    generated = st.session_state.get("generated_table")
+    if use_generated and selection and generated is not None:
+        original = st.session_state.table_data_dict[selection["sheet_name"]][selection["table_index"]]
+        tables[f"{selection['sheet_name']}_{selection['table_index']}"] = (original, generated)
+    return list(tables.values())
+
+def render_export_section():
+    st.subheader("📥 엑셀로 내보내기")
+    sources = st.session_state.get("xlsx_sources") or {}
+    if not sources:
+        st.info("업로드한 xlsx 파일의 표를 편집하면 원본 파일에 다시 써서 내려받을 수 있습니다.")
+        return
 
-        st.session_state["generated_table"] = df
+    st.toggle(
+        "선택한 표 자리에 생성된 표 쓰기",
+        key="export_use_generated",
+        disabled=st.session_state.get("generated_table") is None,
+    )
+    if st.button("📦 엑셀 파일 만들기", key="build_export"):
+        tables = _export_tables(st.session_state.get("export_use_generated", False))
+        st.session_state.export_files = {}
+        try:
+            with stage("export.write_back", tables=len(tables)):
+                overlays, warnings = collect_overlays(tables)
+                # 원본 파일마다 한 번에 반영하고, 만든 결과 파일만 세션에 남깁니다.
+                for name, sheet_overlays in overlays.items():
+                    if name in sources:
+                        data, file_warnings = write_back(sources[name], sheet_overlays)
+                        st.session_state.export_files[name] = data
+                        warnings += [f"{name} / {w}" for w in file_warnings]
+        except Exception as e:
+            st.error(f"엑셀 파일을 만드는 중 오류 발생: {e}")
+            return
+        for warning in warnings:
+            st.warning(warning)
+        if not st.session_state.export_files:
+            st.info("내보낼 편집 내용이 없습니다.")
+
+    for name, data in st.session_state.get("export_files", {}).items():
+        st.download_button(
+            f"⬇️ {name}",
+            data,
+            file_name=f"filled_{name}",
+            mime=XLSX_MIME,
+            key=f"download_export_{name}",
+        )
 
-        st.success("Gemini 결과를 표에 반영했습니다.")
-        st.rerun()
+def start_profiling_run():
+    """app.py 맨 앞에서 호출합니다. 사이드바에서 프로파일링을 켠 경우에만 이번 실행을 기록합니다."""
+    if not st.session_state.get("profiling_enabled", False):
+        recorder = st.session_state.get("profile_recorder")
+        if recorder is not None:
+            recorder.track_memory = False  # 이 세션의 메모리 측정만 내려놓습니다. (다른 세션은 그대로)
+        activate(None)
+        return
+    recorder = st.session_state.get("profile_recorder")
+    if recorder is None:
+        recorder = st.session_state.profile_recorder = ProfileRecorder()
+    recorder.track_memory = st.session_state.get("profiling_memory", False)
+    activate(recorder)
+    st.session_state.profiling_run_start = time.perf_counter()
+
+def render_profiling_panel():
+    """app.py 맨 끝에서 호출합니다. 단계별 측정 결과를 사이드바에 보여 주고 JSONL로 내려받게 합니다."""
+    recorder = current_recorder()
+    if recorder is not None:
+        recorder.add("app.rerun", time.perf_counter() - st.session_state.profiling_run_start)
+
+    with st.sidebar:
+        st.subheader("🛠️ 프로파일링")
+        enabled = st.toggle("단계별 시간 기록", key="profiling_enabled")
+        st.checkbox("메모리도 측정 (tracemalloc, 느려짐)", key="profiling_memory", disabled=not enabled)
+
+        recorder = st.session_state.get("profile_recorder")
+        if recorder is None or not recorder.records:
+            st.caption("기록이 없습니다. 켠 뒤 앱을 사용하면 단계별 기록이 쌓입니다.")
+            return
 
-def render_generated_table():
-    df = st.session_state.get("generated_table")
-    if df is not None:
-        st.subheader("생성된 표")
-        st.dataframe(df, use_container_width=True)
-    else:
-        st.info("아직 생성된 표가 없습니다.")
\ No newline at end of file
+        records = pd.DataFrame(list(recorder.records))
+        last_run = records[records["run"] == records["run"].max()]
+        st.caption(f"마지막 실행 (#{recorder.run_id})")
+        st.dataframe(last_run.drop(columns=["run", "ts"]), hide_index=True, use_container_width=True)
+
+        st.caption(f"전체 {len(records)}개 기록의 단계별 요약")
+        summary = records.groupby("stage").agg(
+            count=("seconds", "size"),
+            mean_s=("seconds", "mean"),
+            max_s=("seconds", "max"),
+            max_peak_mb=("peak_mb", "max"),
+        )
+        st.dataframe(summary.sort_values("max_s", ascending=False), use_container_width=True)
+
+        st.download_button(
+            "📥 JSONL 내려받기",
+            recorder.to_jsonl(),
+            file_name="profile.jsonl",
+            mime="application/jsonl",
+            key="download_profile",
+        )
+        st.button("🗑️ 기록 지우기", key="clear_profile", on_click=recorder.clear)
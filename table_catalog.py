@@ -0,0 +1,109 @@
+import hashlib
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import pandas as pd
+
+from table_types import table_header, table_shape
+
+
+class TableEntry(NamedTuple):
+    key: str                    # edited_table_data 등에서 쓰는 "{시트}_{표 번호}"
+    sheet: str
+    index: int                  # table_data_dict[sheet] 안의 위치
+    label: str                  # "{시트} - 테이블 N"
+    rows: int
+    cols: int
+    header: Tuple[str, ...]     # 첫 행(열 이름)
+    source: Optional[str]       # 원본 파일 이름
+    region: Optional[tuple]     # 원본 시트의 (시작 행, 끝 행, 시작 열, 끝 열)
+    fingerprint: str            # 내용 해시 (같은 표 찾기)
+
+    @property
+    def display(self) -> str:
+        header = ", ".join(h for h in self.header if h)[:60]
+        return f"{self.label} · {self.rows}x{self.cols} · {header}"
+
+
+def table_fingerprint(df: pd.DataFrame) -> str:
+    values = pd.util.hash_pandas_object(df.astype(str), index=False).values
+    extra = repr((table_shape(df), table_header(df) if "header" in df.attrs else None))
+    return hashlib.sha256(values.tobytes() + extra.encode()).hexdigest()[:16]
+
+
+def _header(df: pd.DataFrame) -> Tuple[str, ...]:
+    return tuple("" if pd.isna(value) else str(value).strip() for value in table_header(df))
+
+
+class TableCatalog:
+    """
+    업로드할 때 한 번 만드는 표 목록. 텍스트(1x1)를 뺀 표마다 크기/머리글/위치/내용 해시를 담고
+    키, 레이블, 시트, 내용 해시로 바로 찾을 수 있는 사전 색인을 둡니다.
+    """
+
+    def __init__(self, entries: List[TableEntry]):
+        self.entries = entries
+        self._by_key: Dict[str, TableEntry] = {e.key: e for e in entries}
+        self._by_label: Dict[str, TableEntry] = {e.label: e for e in entries}
+        self._by_sheet: Dict[str, List[TableEntry]] = {}
+        self._by_fingerprint: Dict[str, List[TableEntry]] = {}
+        for entry in entries:
+            self._by_sheet.setdefault(entry.sheet, []).append(entry)
+            self._by_fingerprint.setdefault(entry.fingerprint, []).append(entry)
+        # 검색용 소문자 문자열 (시트 이름 + 머리글)
+        self._search_text = {e.key: " ".join((e.sheet,) + e.header).lower() for e in entries}
+
+    @classmethod
+    def from_tables(cls, table_data_dict: Dict[str, List[pd.DataFrame]]) -> "TableCatalog":
+        entries = []
+        for sheet_name, dfs in table_data_dict.items():
+            number = 0
+            for index, df in enumerate(dfs):
+                shape = table_shape(df)
+                if shape == (1, 1):
+                    continue
+                number += 1
+                entries.append(TableEntry(
+                    key=f"{sheet_name}_{index}",
+                    sheet=sheet_name,
+                    index=index,
+                    label=f"{sheet_name} - 테이블 {number}",
+                    rows=shape[0],
+                    cols=shape[1],
+                    header=_header(df),
+                    source=df.attrs.get("source"),
+                    region=df.attrs.get("region"),
+                    fingerprint=table_fingerprint(df),
+                ))
+        return cls(entries)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def get(self, key: str) -> Optional[TableEntry]:
+        return self._by_key.get(key)
+
+    def by_label(self, label: str) -> Optional[TableEntry]:
+        return self._by_label.get(label)
+
+    def sheets(self) -> List[str]:
+        return list(self._by_sheet)
+
+    def duplicates(self, entry: TableEntry) -> List[TableEntry]:
+        """내용이 같은 다른 표들"""
+        return [e for e in self._by_fingerprint.get(entry.fingerprint, []) if e.key != entry.key]
+
+    def filter(
+        self,
+        sheet: Optional[str] = None,
+        query: str = "",
+        min_rows: int = 0,
+        min_cols: int = 0,
+    ) -> List[TableEntry]:
+        """시트, 검색어(시트 이름/머리글에 모든 단어가 들어 있는 표), 최소 크기로 거릅니다."""
+        entries = self._by_sheet.get(sheet, []) if sheet else self.entries
+        terms = query.lower().split()
+        return [
+            e for e in entries
+            if e.rows >= min_rows and e.cols >= min_cols
+            and all(term in self._search_text[e.key] for term in terms)
+        ]
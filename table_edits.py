@@ -0,0 +1,191 @@
+import pickle
+from collections import deque
+from typing import Any, Dict, List, Tuple
+
+import pandas as pd
+
+from table_types import to_display_frame
+
+# 편집 연산(op)은 작은 튜플로 표현합니다. 되돌리기 기록에는 표 전체가 아니라 이 연산만 남깁니다.
+#   ("set", row_pos, col, value)        셀 하나 변경
+#   ("insert_rows", positions, rows)    positions 위치에 행 삽입 (rows: 값 리스트 목록)
+#   ("delete_rows", positions)          positions 위치의 행 삭제
+#   ("add_col", col, position, values)  position 위치에 열 추가 (values가 None이면 빈 열)
+#   ("drop_col", col)                   열 삭제
+#   ("transpose", index, columns)       전치 후 행/열 이름을 index/columns로 지정
+Op = Tuple
+
+
+def prepare_editable_table(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    data_editor에 넘길 작업용 표를 한 번만 만듭니다.
+    data_editor는 열 이름을 문자열로 다루므로 미리 맞추고, object/category 열은 문자열로 바꿉니다.
+    """
+    df = to_display_frame(df)
+    # 새 행의 빈 칸을 담을 수 있도록 정수/불리언 열은 결측값을 허용하는 타입으로 바꿉니다.
+    for col in df.columns:
+        if pd.api.types.is_integer_dtype(df[col].dtype):
+            df[col] = df[col].astype("Int64")
+        elif pd.api.types.is_bool_dtype(df[col].dtype):
+            df[col] = df[col].astype("boolean")
+    df.columns = [str(col) for col in df.columns]
+    df.reset_index(drop=True, inplace=True)
+    return df
+
+
+def _coerce(df: pd.DataFrame, col: str, value: Any) -> Any:
+    if value is None:
+        return None
+    if pd.api.types.is_numeric_dtype(df[col].dtype) and not pd.api.types.is_bool_dtype(df[col].dtype):
+        return pd.to_numeric(value, errors="coerce")
+    if pd.api.types.is_datetime64_any_dtype(df[col].dtype):
+        return pd.to_datetime(value, errors="coerce")
+    return value
+
+
+def _restore_dtypes(df: pd.DataFrame, dtypes: pd.Series) -> pd.DataFrame:
+    """행을 끼워 넣으면 pandas가 열 타입을 object/float로 넓히므로 원래 타입으로 되돌립니다."""
+    for col, dtype in dtypes.items():
+        if df[col].dtype != dtype:
+            try:
+                df[col] = df[col].astype(dtype)
+            except (TypeError, ValueError):
+                pass
+    return df
+
+
+def apply_ops(df: pd.DataFrame, ops: List[Op]) -> Tuple[pd.DataFrame, List[Op]]:
+    """
+    ops를 순서대로 적용하고 (결과 표, 되돌리기 ops)를 돌려줍니다.
+    셀 변경/행 추가/열 추가·삭제는 df를 제자리에서 바꾸고, 전치와 중간 행 삽입만 새 표를 만듭니다.
+    """
+    inverse = []
+    for op in ops:
+        kind = op[0]
+        if kind == "set":
+            _, row_pos, col, value = op
+            col_pos = df.columns.get_loc(col)
+            inverse.append(("set", row_pos, col, df.iat[row_pos, col_pos]))
+            df.iat[row_pos, col_pos] = value
+        elif kind == "delete_rows":
+            positions = sorted(op[1])
+            rows = [df.iloc[pos].tolist() for pos in positions]
+            df.drop(df.index[positions], inplace=True)
+            df.reset_index(drop=True, inplace=True)
+            inverse.append(("insert_rows", positions, rows))
+        elif kind == "insert_rows":
+            _, positions, rows = op
+            dtypes = df.dtypes
+            if positions and positions[0] >= len(df):
+                # 끝에 붙이는 경우는 제자리에서 처리합니다.
+                for row in rows:
+                    df.loc[len(df)] = row
+            else:
+                values = df.values.tolist()
+                for pos, row in zip(positions, rows):
+                    values.insert(pos, row)
+                df = pd.DataFrame(values, columns=df.columns)
+            df = _restore_dtypes(df, dtypes)
+            inverse.append(("delete_rows", list(positions)))
+        elif kind == "add_col":
+            _, col, position, values = op
+            df.insert(position, col, values)
+            inverse.append(("drop_col", col))
+        elif kind == "drop_col":
+            col = op[1]
+            position = df.columns.get_loc(col)
+            inverse.append(("add_col", col, position, df[col].tolist()))
+            del df[col]
+        elif kind == "transpose":
+            _, index, columns = op
+            inverse.append(("transpose", list(df.index), list(df.columns)))
+            df = df.transpose()
+            df.index = index
+            df.columns = columns
+        else:
+            raise ValueError(f"알 수 없는 편집 연산: {kind}")
+    inverse.reverse()
+    return df, inverse
+
+
+def editor_delta_to_ops(df: pd.DataFrame, delta: Dict[str, Any]) -> List[Op]:
+    """
+    st.data_editor의 변경 상태(edited_rows/deleted_rows/added_rows)를 편집 연산으로 바꿉니다.
+    적용 순서는 data_editor와 같습니다. (셀 변경 → 행 삭제 → 행 추가)
+    """
+    ops = []
+    for row_pos, changes in delta.get("edited_rows", {}).items():
+        for col, value in changes.items():
+            if col in df.columns:
+                ops.append(("set", int(row_pos), col, _coerce(df, col, value)))
+
+    deleted = delta.get("deleted_rows", [])
+    if deleted:
+        ops.append(("delete_rows", sorted(deleted)))
+
+    added = delta.get("added_rows", [])
+    if added:
+        start = len(df) - len(deleted)
+        rows = [[_coerce(df, col, row.get(col)) for col in df.columns] for row in added]
+        ops.append(("insert_rows", list(range(start, start + len(rows))), rows))
+    return ops
+
+
+class EditHistory:
+    """
+    되돌리기/다시 실행 기록. 각 단계는 (undo ops, redo ops) 쌍으로만 저장하고,
+    max_bytes(pickle 크기 기준) 또는 max_steps를 넘으면 가장 오래된 단계부터 버립니다.
+    """
+
+    def __init__(self, max_bytes: int = 8 * 1024 * 1024, max_steps: int = 200):
+        self.max_bytes = max_bytes
+        self.max_steps = max_steps
+        self._undo = deque()
+        self._redo = deque()
+        self._size = 0
+
+    @staticmethod
+    def _entry_size(entry) -> int:
+        return len(pickle.dumps(entry, protocol=pickle.HIGHEST_PROTOCOL))
+
+    def _push_undo(self, entry, size: int):
+        self._undo.append((entry, size))
+        self._size += size
+        while self._undo and (self._size > self.max_bytes or len(self._undo) > self.max_steps):
+            _, old_size = self._undo.popleft()
+            self._size -= old_size
+
+    def record(self, undo_ops: List[Op], redo_ops: List[Op]):
+        if not redo_ops:
+            return
+        entry = (undo_ops, redo_ops)
+        self._push_undo(entry, self._entry_size(entry))
+        self._redo.clear()
+
+    def apply(self, df: pd.DataFrame, ops: List[Op]) -> pd.DataFrame:
+        """ops를 적용하고 기록합니다."""
+        df, inverse = apply_ops(df, ops)
+        self.record(inverse, ops)
+        return df
+
+    @property
+    def can_undo(self) -> bool:
+        return bool(self._undo)
+
+    @property
+    def can_redo(self) -> bool:
+        return bool(self._redo)
+
+    def undo(self, df: pd.DataFrame) -> pd.DataFrame:
+        (undo_ops, redo_ops), size = self._undo.pop()
+        self._size -= size
+        df, _ = apply_ops(df, undo_ops)
+        self._redo.append((undo_ops, redo_ops))
+        return df
+
+    def redo(self, df: pd.DataFrame) -> pd.DataFrame:
+        undo_ops, redo_ops = self._redo.pop()
+        df, _ = apply_ops(df, redo_ops)
+        entry = (undo_ops, redo_ops)
+        self._push_undo(entry, self._entry_size(entry))
+        return df
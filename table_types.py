@@ -0,0 +1,92 @@
+from typing import Tuple
+
+import pandas as pd
+
+# 고유값 비율이 이 값 이하인 문자열/혼합 열은 category로 저장합니다. (O/X 표, 반복되는 코드값 등)
+CATEGORY_MAX_UNIQUE_RATIO = 0.5
+# 이보다 짧은 열은 category로 바꿔도 이득이 없습니다.
+CATEGORY_MIN_ROWS = 8
+
+_INFERRED_DTYPES = {
+    "floating": "float64",
+    "mixed-integer-float": "float64",
+    "boolean": "boolean",
+}
+
+
+def _compact_column(col: pd.Series) -> pd.Series:
+    if col.dtype == object:
+        inferred = pd.api.types.infer_dtype(col, skipna=True)
+        if inferred == "integer":
+            return col.astype("Int64" if col.isna().any() else "int64")
+        if inferred in _INFERRED_DTYPES:
+            return col.astype(_INFERRED_DTYPES[inferred])
+        if inferred in ("datetime", "datetime64", "date"):
+            return pd.to_datetime(col, errors="coerce")
+    elif not pd.api.types.is_string_dtype(col.dtype):
+        return col  # 이미 숫자/날짜 등 타입이 있는 열
+
+    n_rows = len(col)
+    if n_rows >= CATEGORY_MIN_ROWS and col.nunique(dropna=True) <= n_rows * CATEGORY_MAX_UNIQUE_RATIO:
+        return col.astype("category")
+    return col
+
+
+def _compact_columns(df: pd.DataFrame) -> pd.DataFrame:
+    return pd.DataFrame({name: _compact_column(df[name]) for name in df.columns}, columns=df.columns)
+
+
+def compact_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    추출한 표의 열을 값에 맞는 작은 타입(int/float/datetime/boolean/category)으로 바꿉니다.
+    첫 행(머리글)은 글자라서 열에 섞이면 숫자/날짜 열도 object로 남으므로, 두 행 이상인 표는
+    머리글을 attrs["header"]로 떼어 두고 나머지 행으로만 타입을 정합니다. (with_header로 되돌립니다)
+    타입이 섞인 열은 반복값이 많을 때만 category가 되고, 그 외에는 그대로 둡니다.
+    """
+    if len(df) < 2:
+        return _compact_columns(df)
+    body = _compact_columns(df.iloc[1:].reset_index(drop=True))
+    body.attrs["header"] = df.iloc[0].tolist()
+    return body
+
+
+def table_header(df: pd.DataFrame) -> list:
+    """표의 첫 행(머리글) 값"""
+    if "header" in df.attrs:
+        return list(df.attrs["header"])
+    return df.iloc[0].tolist() if len(df) else []
+
+
+def table_shape(df: pd.DataFrame) -> Tuple[int, int]:
+    """머리글 행을 포함한 원래 표 크기"""
+    n_rows, n_cols = df.shape
+    return (n_rows + 1 if "header" in df.attrs else n_rows), n_cols
+
+
+def with_header(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    compact_dtypes로 떼어 둔 머리글을 첫 행으로 되돌린 표. (모든 열이 object, 빈 칸은 None)
+    머리글이 없는 표는 그대로 돌려줍니다.
+    """
+    if "header" not in df.attrs:
+        return df
+    body = df.astype(object).where(df.notna(), None)
+    full = pd.DataFrame([df.attrs["header"]], columns=df.columns, dtype=object)
+    full = pd.concat([full, body], ignore_index=True)
+    full.attrs = {key: value for key, value in df.attrs.items() if key != "header"}
+    return full
+
+
+def to_display_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    st.dataframe/st.data_editor에 넘길 문자열 뷰. 원본 df는 바꾸지 않습니다.
+    머리글을 첫 행으로 되돌리고, object/category 열만 문자열로 바꿉니다. (숫자/날짜 열은 타입 유지)
+    """
+    df = with_header(df).copy()
+    for col in df.columns:
+        dtype = df[col].dtype
+        if isinstance(dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype(object).astype(str)
+        elif dtype == object:
+            df[col] = df[col].astype(str)
+    return df
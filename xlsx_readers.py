@@ -0,0 +1,218 @@
+import posixpath
+import zipfile
+from typing import Any, Dict, Iterator, List, Tuple
+from xml.etree.ElementTree import iterparse
+
+# openpyxl은 가져오는 데만 수십 ms가 걸려, 실제로 파일을 읽을 때 각 함수 안에서 가져옵니다.
+
+# 시트 하나의 값 그리드: (row, col) -> 값. 값이 None인 셀은 저장하지 않습니다.
+SheetCells = Dict[Tuple[int, int], Any]
+
+MAIN_NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+REL_NS = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+PKG_REL_NS = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+
+
+# ✅ openpyxl 일반 모드 (기존 경로): 워크시트 객체를 그대로 넘깁니다.
+def read_xlsx_openpyxl(uploaded_file) -> Iterator[Tuple[str, Any]]:
+    from openpyxl import load_workbook
+
+    wb = load_workbook(uploaded_file, data_only=True)
+    for sheet_name in wb.sheetnames:
+        yield sheet_name, wb[sheet_name]
+
+
+# ✅ openpyxl 읽기 전용 모드: Cell 객체 없이 행 단위 값만 읽습니다.
+def read_xlsx_readonly(uploaded_file) -> Iterator[Tuple[str, SheetCells]]:
+    from openpyxl import load_workbook
+
+    wb = load_workbook(uploaded_file, read_only=True, data_only=True)
+    try:
+        for ws in wb.worksheets:
+            cells = {}
+            # 행 순서가 아니라 셀의 좌표를 씁니다. 행 번호(r)가 없는 행은 순서대로 번호가 매겨져
+            # 셀 좌표(r)와 어긋날 수 있습니다.
+            for row in ws.iter_rows():
+                for cell in row:
+                    if cell.value is not None:
+                        cells[(cell.row, cell.column)] = cell.value
+            yield ws.title, cells
+    finally:
+        wb.close()
+
+
+def read_part_rels(archive: zipfile.ZipFile, part: str) -> Dict[str, Tuple[str, str]]:
+    """part에 대한 관계 파일을 읽어 {rId: (type, 절대 경로)}를 돌려줍니다."""
+    folder, name = posixpath.split(part)
+    rels_path = posixpath.join(folder, "_rels", f"{name}.rels")
+    if rels_path not in archive.namelist():
+        return {}
+
+    rels = {}
+    for _, node in iterparse(archive.open(rels_path)):
+        if node.tag == f"{PKG_REL_NS}Relationship":
+            target = node.get("Target")
+            if target.startswith("/"):
+                target = target[1:]
+            else:
+                target = posixpath.normpath(posixpath.join(folder, target))
+            rels[node.get("Id")] = (node.get("Type", ""), target)
+    return rels
+
+
+def _read_shared_strings(archive: zipfile.ZipFile, path: str) -> List[str]:
+    strings = []
+    for _, node in iterparse(archive.open(path)):
+        if node.tag == f"{MAIN_NS}si":
+            # 서식 run(<r><t>)은 이어 붙이고, 윗주(<rPh>)는 제외합니다.
+            snippets = [node.findtext(f"{MAIN_NS}t") or ""]
+            snippets += [r.findtext(f"{MAIN_NS}t") or "" for r in node.iterfind(f"{MAIN_NS}r")]
+            strings.append("".join(snippets).replace("x005F_", ""))
+            node.clear()
+    return strings
+
+
+def _read_date_styles(archive: zipfile.ZipFile, path: str) -> Tuple[set, set]:
+    """날짜/기간 서식을 쓰는 셀 스타일(cellXfs) 인덱스를 찾습니다."""
+    from openpyxl.styles.numbers import BUILTIN_FORMATS, is_date_format, is_timedelta_format
+
+    custom = {}
+    xf_formats = []
+    in_cell_xfs = False
+    for event, node in iterparse(archive.open(path), events=("start", "end")):
+        if node.tag == f"{MAIN_NS}cellXfs":
+            in_cell_xfs = event == "start"
+        elif event == "end" and node.tag == f"{MAIN_NS}numFmt":
+            custom[int(node.get("numFmtId"))] = node.get("formatCode")
+        elif event == "end" and in_cell_xfs and node.tag == f"{MAIN_NS}xf":
+            xf_formats.append(int(node.get("numFmtId", 0)))
+
+    date_styles, timedelta_styles = set(), set()
+    for idx, fmt_id in enumerate(xf_formats):
+        fmt = custom.get(fmt_id, BUILTIN_FORMATS.get(fmt_id))
+        if is_date_format(fmt):
+            date_styles.add(idx)
+        if is_timedelta_format(fmt):
+            timedelta_styles.add(idx)
+    return date_styles, timedelta_styles
+
+
+def _cast_number(value: str):
+    if "." in value or "E" in value or "e" in value:
+        return float(value)
+    return int(value)
+
+
+def _read_sheet_cells(source, shared_strings, date_styles, timedelta_styles, epoch) -> SheetCells:
+    from openpyxl.utils.cell import coordinate_to_tuple
+    from openpyxl.utils.datetime import from_excel, from_ISO8601
+
+    cells = {}
+    row_counter = 0
+    col_counter = 0
+    pending = []  # 좌표(r 속성)가 없는 셀은 행이 끝날 때 위치를 정합니다.
+    sheet_data = None
+
+    for event, node in iterparse(source, events=("start", "end")):
+        tag = node.tag
+        if event == "start":
+            if tag == f"{MAIN_NS}sheetData":
+                sheet_data = node
+            continue
+
+        if tag == f"{MAIN_NS}row":
+            row_counter = int(node.get("r", row_counter + 1))
+            for col, value in pending:
+                if value is not None:
+                    cells[(row_counter, col)] = value
+            pending = []
+            col_counter = 0
+            # 처리한 행은 트리에서 떼어내 메모리를 일정하게 유지합니다.
+            if sheet_data is not None:
+                sheet_data.clear()
+            continue
+        if tag != f"{MAIN_NS}c":
+            continue
+
+        data_type = node.get("t", "n")
+        if data_type == "inlineStr":
+            child = node.find(f"{MAIN_NS}is")
+            value = None
+            if child is not None:
+                snippets = [child.findtext(f"{MAIN_NS}t") or ""]
+                snippets += [r.findtext(f"{MAIN_NS}t") or "" for r in child.iterfind(f"{MAIN_NS}r")]
+                value = "".join(snippets)
+        else:
+            value = node.findtext(f"{MAIN_NS}v") or None
+            if value is not None:
+                if data_type == "n":
+                    value = _cast_number(value)
+                    style_id = int(node.get("s", 0))
+                    if style_id in date_styles:
+                        try:
+                            value = from_excel(value, epoch, timedelta=style_id in timedelta_styles)
+                        except (OverflowError, ValueError):
+                            value = "#VALUE!"
+                elif data_type == "s":
+                    value = shared_strings[int(value)]
+                elif data_type == "b":
+                    value = bool(int(value))
+                elif data_type == "d":
+                    value = from_ISO8601(value)
+
+        coordinate = node.get("r")
+        if coordinate:
+            row, col_counter = coordinate_to_tuple(coordinate)
+            if value is not None:
+                cells[(row, col_counter)] = value
+        else:
+            col_counter += 1
+            pending.append((col_counter, value))
+
+    return cells
+
+
+# ✅ xlsx 패키지의 XML을 직접 iterparse 합니다. (가장 빠르고 메모리를 적게 씀)
+def read_xlsx_xml(uploaded_file) -> Iterator[Tuple[str, SheetCells]]:
+    from openpyxl.utils.datetime import CALENDAR_MAC_1904, CALENDAR_WINDOWS_1900
+
+    with zipfile.ZipFile(uploaded_file) as archive:
+        workbook_path = next(
+            (target for rel_type, target in read_part_rels(archive, "").values()
+             if rel_type.endswith("/officeDocument")),
+            "xl/workbook.xml",
+        )
+        rels = read_part_rels(archive, workbook_path)
+
+        shared_strings = []
+        date_styles, timedelta_styles = set(), set()
+        for rel_type, target in rels.values():
+            if rel_type.endswith("/sharedStrings"):
+                shared_strings = _read_shared_strings(archive, target)
+            elif rel_type.endswith("/styles"):
+                date_styles, timedelta_styles = _read_date_styles(archive, target)
+
+        epoch = CALENDAR_WINDOWS_1900
+        sheets = []
+        for _, node in iterparse(archive.open(workbook_path)):
+            if node.tag == f"{MAIN_NS}workbookPr":
+                if node.get("date1904") in ("1", "true"):
+                    epoch = CALENDAR_MAC_1904
+            elif node.tag == f"{MAIN_NS}sheet":
+                rel_type, target = rels.get(node.get(f"{REL_NS}id"), ("", None))
+                if target is not None and rel_type.endswith("/worksheet"):
+                    sheets.append((node.get("name"), target))
+
+        for sheet_name, target in sheets:
+            with archive.open(target) as source:
+                yield sheet_name, _read_sheet_cells(
+                    source, shared_strings, date_styles, timedelta_styles, epoch
+                )
+
+
+XLSX_READERS = {
+    "openpyxl": read_xlsx_openpyxl,
+    "readonly": read_xlsx_readonly,
+    "xml": read_xlsx_xml,
+}
+DEFAULT_XLSX_READER = "xml"